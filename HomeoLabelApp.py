@@ -4,14 +4,21 @@ import json
 import logging
 import pandas as pd
 from PyQt5 import QtWidgets, QtCore
-from PyQt5.QtWidgets import QCompleter, QTableWidgetItem, QMessageBox
-from reportlab.pdfgen import canvas
-from reportlab.lib.units import mm
-from reportlab.pdfbase.pdfmetrics import stringWidth
+from PyQt5.QtWidgets import QCompleter, QMessageBox
 import win32api
 import win32print
-from pathlib import Path
+from datetime import datetime
 import platform
+from autocomplete_store import AutocompleteSaver, AutocompleteStore
+from label_layout import compile_layout, render_pdf
+from mutation_log import AUTOCOMPLETE, MEDICINE, MutationLog
+from potency import COMMON_POTENCIES, complete, parse_potency, potency_key
+from records_journal import RecordsJournal, RecordsWriter
+from records_store import RecordsRepository
+from remedy_model import RemedyResultModel
+from remedy_search import AUTO, SearchEngine
+from remedy_store import RemedyStore
+from remedy_worker import SearchDispatcher
 
 # ---- DPI awareness for Windows ----
 if platform.system() == "Windows":
@@ -52,12 +59,36 @@ class HomeoLabelApp(QtWidgets.QWidget):
         logging.basicConfig(filename="records/error_log.txt", level=logging.INFO,
                             format='%(asctime)s - %(levelname)s - %(message)s')
         self.excel_file = os.path.join(self.records_folder, 'records.xlsx')
+        self.records_journal_dir = os.path.join(self.records_folder, 'journal')
+        self.records_db = os.path.join(self.records_folder, 'records.db')
         self.autocomplete_file = os.path.join(self.records_folder, 'autocomplete.json')
         self.remedies_file = 'remedies.xlsx'
-        self.df_remedies = None
+        self.remedies_db = os.path.join(self.records_folder, 'remedies.db')
+        # autocomplete values and new medicines are logged here before their files are rewritten
+        self.wal = MutationLog(os.path.join(self.records_folder, 'wal.jsonl'))
+        self.remedy_store = None
+        self.remedy_names = ({}, {})
+        self.search_engine = None
+        # values predict_details filled in, so it may replace them but never what staff typed
+        self._predicted = {}
+        self._predicting = False
+        # labels waiting to be printed together as one job
+        self.print_queue_records = []
         self.load_remedies()
+        for entry in self.wal.entries(MEDICINE) if self.remedy_store else []:
+            self.apply_new_medicine(entry["common"], entry["latin"])
         self.autocomplete_data = self.load_autocomplete()
-        self.record_buffer = []
+        # logs uses and rewrites autocomplete.json from a background thread
+        self.autocomplete_saver = AutocompleteSaver(self.autocomplete_data, self.autocomplete_file, self.wal)
+        if self.wal.entries(AUTOCOMPLETE) or self.autocomplete_merged:
+            self.autocomplete_saver.request_save()
+        # monthly partitions; the single-file journal or records.xlsx is split into them on first use
+        self.records_journal = RecordsJournal(
+            self.records_journal_dir, self.excel_file,
+            legacy_paths=[os.path.join(self.records_folder, 'records.jsonl'), self.excel_file])
+        self.records_repo = RecordsRepository(self.records_db)
+        # persists and indexes records behind printing; also recovers what a previous session left pending
+        self.records_writer = RecordsWriter(self.records_journal, self.records_repo)
         self.init_ui()
 
     def load_remedies(self):
@@ -68,35 +99,39 @@ class HomeoLabelApp(QtWidgets.QWidget):
             })
             df.to_excel(self.remedies_file, index=False, engine="openpyxl")
         try:
-            self.df_remedies = pd.read_excel(self.remedies_file, engine="openpyxl")
-            self.df_remedies.fillna('', inplace=True)
+            self.remedy_store = RemedyStore(self.remedies_db)
+            self.remedy_store.sync_from_excel(self.remedies_file)
+            rows = self.remedy_store.rows()
+            self.search_engine = SearchEngine.from_rows(rows)
+            for rid, common, latin in rows:
+                self.remedy_names[0][rid] = common
+                self.remedy_names[1][rid] = latin
             logging.info("Remedies loaded successfully.")
         except Exception as e:
             logging.error(f"Failed to load remedies.xlsx: {e}")
             QMessageBox.critical(self, "Error", f"Failed to load remedies.xlsx:\n{e}")
 
     def load_autocomplete(self):
-        if os.path.exists(self.autocomplete_file):
-            try:
-                with open(self.autocomplete_file, "r") as f:
-                    return json.load(f)
-            except Exception as e:
-                logging.warning(f"Autocomplete file load failed: {e}")
-                return {}
-        return {}
-
-    def save_autocomplete(self):
+        data, saved_at = {}, None
         backup_file = self.autocomplete_file.replace(".json", "_backup.json")
-        try:
-            if Path(self.autocomplete_file).exists():
-                os.replace(self.autocomplete_file, backup_file)
-            tmp_file = self.autocomplete_file + ".tmp"
-            with open(tmp_file, "w") as f:
-                json.dump(self.autocomplete_data, f)
-            os.replace(tmp_file, self.autocomplete_file)
-            logging.info("Autocomplete saved successfully.")
-        except Exception as e:
-            logging.error(f"Failed to save autocomplete.json: {e}")
+        for path in (self.autocomplete_file, backup_file):
+            if os.path.exists(path):
+                try:
+                    with open(path, "r") as f:
+                        data = json.load(f)
+                    saved_at = os.path.getmtime(path)
+                    break
+                except Exception as e:
+                    logging.warning(f"Autocomplete file load failed ({path}): {e}")
+        # plain {field: [values]} files from older versions are migrated here, as last used when saved
+        store = AutocompleteStore.from_json(data, now=saved_at)
+        # uses logged since the last checkpoint
+        for entry in self.wal.entries(AUTOCOMPLETE):
+            store.replay(entry["field"], entry["value"], entry.get("ts"))
+        # values differing only in case, spacing or punctuation are merged on every start;
+        # spelling variants are merged with `python autocomplete_store.py --apply`
+        self.autocomplete_merged = store.canonicalize(score_cutoff=100)
+        return store
 
     def init_ui(self):
         font_medsz = int(18 * self.scaling)
@@ -113,9 +148,13 @@ class HomeoLabelApp(QtWidgets.QWidget):
         self.medicine_search.textChanged.connect(self.update_suggestions)
         left_panel.addWidget(QtWidgets.QLabel("Find Medicine", styleSheet=f"font-weight:bold; font-size:{font_lbl}pt;"))
         left_panel.addWidget(self.medicine_search)
-        self.suggestion_table = QtWidgets.QTableWidget()
-        self.suggestion_table.setColumnCount(2)
-        self.suggestion_table.setHorizontalHeaderLabels(["Common Name", "Latin Name"])
+        self.suggestion_model = RemedyResultModel(("Common Name", "Latin Name"), self)
+        self.suggestion_model.set_catalog(*self.remedy_names)
+        self.suggestion_search = SearchDispatcher(self)
+        self.suggestion_search.results_ready.connect(self.suggestion_model.set_results)
+        self.suggestion_search.search_failed.connect(lambda msg: logging.error(f"Suggestion search failed: {msg}"))
+        self.suggestion_table = QtWidgets.QTableView()
+        self.suggestion_table.setModel(self.suggestion_model)
         self.suggestion_table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
         self.suggestion_table.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
         self.suggestion_table.setStyleSheet(f"font-size:{int(14 * self.scaling)}pt;")
@@ -126,7 +165,7 @@ class HomeoLabelApp(QtWidgets.QWidget):
         header = self.suggestion_table.horizontalHeader()
         header.setSectionResizeMode(0, QtWidgets.QHeaderView.Fixed)
         header.setSectionResizeMode(1, QtWidgets.QHeaderView.Fixed)
-        self.suggestion_table.cellClicked.connect(self.on_suggestion_clicked)
+        self.suggestion_table.clicked.connect(self.on_suggestion_clicked)
         left_panel.addWidget(QtWidgets.QLabel("Suggestions", styleSheet=f"font-weight:bold; font-size:{int(15 * self.scaling)}pt;"))
         left_panel.addWidget(self.suggestion_table)
         self.add_new_btn = QtWidgets.QPushButton("Add New Medicine")
@@ -148,16 +187,31 @@ class HomeoLabelApp(QtWidgets.QWidget):
         form.addRow(QtWidgets.QLabel("Potency:", styleSheet=f"font-size:{int(15*self.scaling)}pt; font-weight:bold;"), self.potency_input)
         self.potency_input.setEditable(True)
         self.potency_input.setStyleSheet(f"font-size:{int(16*self.scaling)}pt; padding:{int(7*self.scaling)}px;")
-        pot_list = self.autocomplete_data.get("potency", [])
+        pot_list = self.autocomplete_data.ranked("potency")
         self.potency_input.addItems(pot_list)
-        self.potency_input.setCompleter(QCompleter(pot_list))
+        # The completer shows exactly potency_completions(text): matches are found by potency, not by
+        # spelling, so typing "1000C" offers "1M". The model is refilled before the popup updates.
+        self.potency_model = QtCore.QStringListModel(self.potency_completions(""), self)
+        potency_completer = QCompleter(self.potency_model, self)
+        potency_completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        self.potency_input.setCompleter(potency_completer)
+        self.potency_input.lineEdit().textEdited.connect(
+            lambda text: self.potency_model.setStringList(self.potency_completions(text)))
+        self.potency_input.currentTextChanged.connect(self.check_potency)
         self.potency_input.currentTextChanged.connect(self.update_preview)
+        # a different potency usually means a different dose and time; predicting queries
+        # records.db, so wait until typing pauses
+        self.predict_timer = QtCore.QTimer(self)
+        self.predict_timer.setSingleShot(True)
+        self.predict_timer.setInterval(250)
+        self.predict_timer.timeout.connect(lambda: self.predict_details())
+        self.potency_input.currentTextChanged.connect(lambda _: self._predicting or self.predict_timer.start())
 
         self.dose_input = QtWidgets.QComboBox()
         form.addRow(QtWidgets.QLabel("Dose:", styleSheet=f"font-size:{int(15*self.scaling)}pt; font-weight:bold;"), self.dose_input)
         self.dose_input.setEditable(True)
         self.dose_input.setStyleSheet(f"font-size:{int(16*self.scaling)}pt; padding:{int(7*self.scaling)}px;")
-        dose_list = self.autocomplete_data.get("dose", [])
+        dose_list = self.autocomplete_data.ranked("dose")
         self.dose_input.addItems(dose_list)
         self.dose_input.setCompleter(QCompleter(dose_list))
         self.dose_input.currentTextChanged.connect(self.update_preview)
@@ -166,7 +220,7 @@ class HomeoLabelApp(QtWidgets.QWidget):
         form.addRow(QtWidgets.QLabel("Time:", styleSheet=f"font-size:{int(15*self.scaling)}pt; font-weight:bold;"), self.time_input)
         self.time_input.setEditable(True)
         self.time_input.setStyleSheet(f"font-size:{int(16*self.scaling)}pt; padding:{int(7*self.scaling)}px;")
-        time_list = self.autocomplete_data.get("time", [])
+        time_list = self.autocomplete_data.ranked("time")
         self.time_input.addItems(time_list)
         self.time_input.setCompleter(QCompleter(time_list))
         self.time_input.currentTextChanged.connect(self.update_preview)
@@ -175,7 +229,7 @@ class HomeoLabelApp(QtWidgets.QWidget):
         form.addRow(QtWidgets.QLabel("Shop Name:", styleSheet=f"font-size:{int(15*self.scaling)}pt; font-weight:bold;"), self.shop_input)
         self.shop_input.setEditable(True)
         self.shop_input.setStyleSheet(f"font-size:{int(16*self.scaling)}pt; padding:{int(7*self.scaling)}px;")
-        shop_list = self.autocomplete_data.get("shop", [])
+        shop_list = self.autocomplete_data.ranked("shop")
         self.shop_input.addItems(shop_list)
         self.shop_input.setCompleter(QCompleter(shop_list))
         self.shop_input.currentTextChanged.connect(self.update_preview)
@@ -184,7 +238,7 @@ class HomeoLabelApp(QtWidgets.QWidget):
         form.addRow(QtWidgets.QLabel("Branch/Phone:", styleSheet=f"font-size:{int(15*self.scaling)}pt; font-weight:bold;"), self.branch_phone_input)
         self.branch_phone_input.setEditable(True)
         self.branch_phone_input.setStyleSheet(f"font-size:{int(16*self.scaling)}pt; padding:{int(7*self.scaling)}px;")
-        branch_list = self.autocomplete_data.get("branch", [])
+        branch_list = self.autocomplete_data.ranked("branch")
         self.branch_phone_input.addItems(branch_list)
         self.branch_phone_input.setCompleter(QCompleter(branch_list))
         self.branch_phone_input.currentTextChanged.connect(self.update_preview)
@@ -244,7 +298,44 @@ class HomeoLabelApp(QtWidgets.QWidget):
         self.direct_print_btn.setStyleSheet(f'font-weight:bold; font-size:{int(18*self.scaling)}pt; padding:{int(14*self.scaling)}px;')
         self.direct_print_btn.clicked.connect(self.print_direct)
         btn_layout.addWidget(self.direct_print_btn)
+        self.export_records_btn = QtWidgets.QPushButton("Export Records")
+        self.export_records_btn.setStyleSheet(f"padding:{pad_btn}px; font-size:{int(14*self.scaling)}pt; font-weight:bold;")
+        self.export_records_btn.setToolTip("Export printed labels to Excel, optionally by date or shop")
+        self.export_records_btn.clicked.connect(self.open_export_dialog)
+        btn_layout.addWidget(self.export_records_btn)
+        self.reprint_btn = QtWidgets.QPushButton("Find / Reprint")
+        self.reprint_btn.setStyleSheet(f"padding:{pad_btn}px; font-size:{int(14*self.scaling)}pt; font-weight:bold;")
+        self.reprint_btn.setToolTip("Search printed labels and print one again")
+        self.reprint_btn.clicked.connect(self.open_reprint_dialog)
+        btn_layout.addWidget(self.reprint_btn)
+        self.stats_btn = QtWidgets.QPushButton("Stats")
+        self.stats_btn.setStyleSheet(f"padding:{pad_btn}px; font-size:{int(14*self.scaling)}pt; font-weight:bold;")
+        self.stats_btn.setToolTip("Labels printed today and this month")
+        self.stats_btn.clicked.connect(self.open_stats_dialog)
+        btn_layout.addWidget(self.stats_btn)
         right_panel.addLayout(btn_layout)
+        queue_box = QtWidgets.QGroupBox("Print Queue")
+        queue_box.setStyleSheet(f"font-size:{int(14*self.scaling)}pt;")
+        queue_layout = QtWidgets.QVBoxLayout(queue_box)
+        self.queue_list = QtWidgets.QListWidget()
+        self.queue_list.setMaximumHeight(int(140 * self.scaling))
+        queue_layout.addWidget(self.queue_list)
+        queue_btns = QtWidgets.QHBoxLayout()
+        self.queue_add_btn = QtWidgets.QPushButton("Add to Queue")
+        self.queue_add_btn.setToolTip("Queue this label; the queue prints as one job")
+        self.queue_add_btn.clicked.connect(self.add_to_queue)
+        self.queue_remove_btn = QtWidgets.QPushButton("Remove")
+        self.queue_remove_btn.clicked.connect(self.remove_from_queue)
+        self.queue_clear_btn = QtWidgets.QPushButton("Clear")
+        self.queue_clear_btn.clicked.connect(self.clear_queue)
+        self.queue_print_btn = QtWidgets.QPushButton("Print Queue")
+        self.queue_print_btn.setToolTip("Print every queued label in a single PDF, one page per label")
+        self.queue_print_btn.clicked.connect(self.print_queue)
+        for btn in (self.queue_add_btn, self.queue_remove_btn, self.queue_clear_btn, self.queue_print_btn):
+            btn.setStyleSheet(f"padding:{pad_btn}px; font-size:{int(14*self.scaling)}pt; font-weight:bold;")
+            queue_btns.addWidget(btn)
+        queue_layout.addLayout(queue_btns)
+        right_panel.addWidget(queue_box)
         self.status = QtWidgets.QLabel("Ready")
         self.status.setStyleSheet(f"color: darkgreen; font-size:{int(16*self.scaling)}pt")
         right_panel.addWidget(self.status)
@@ -253,23 +344,17 @@ class HomeoLabelApp(QtWidgets.QWidget):
 
     def update_suggestions(self):
         text = self.medicine_search.text().lower().strip()
-        self.suggestion_table.setRowCount(0)
         if not text:
+            self.suggestion_search.cancel()
+            self.suggestion_model.clear()
             return
-        for _, row in self.df_remedies.iterrows():
-            common = str(row['common_col'])
-            latin = str(row['latin_col'])
-            if text in common.lower() or text in latin.lower():
-                row_idx = self.suggestion_table.rowCount()
-                self.suggestion_table.insertRow(row_idx)
-                self.suggestion_table.setItem(row_idx, 0, QTableWidgetItem(common))
-                self.suggestion_table.setItem(row_idx, 1, QTableWidgetItem(latin))
+        # contains, falling back to names within a typo or two
+        self.suggestion_search.submit(lambda: self.search_engine.search(text, AUTO))
         # No auto-resize! Columns remain fixed.
 
-    def on_suggestion_clicked(self, row, column):
-        item = self.suggestion_table.item(row, column)
-        if item:
-            self.medicine_search.setText(item.text())
+    def on_suggestion_clicked(self, index):
+        if index.isValid():
+            self.medicine_search.setText(index.data())
             self.update_selected_medicine()
 
     def add_new_medicine(self):
@@ -302,38 +387,334 @@ class HomeoLabelApp(QtWidgets.QWidget):
             self.update_suggestions()
 
     def save_new_medicine(self, common_name, latin_name):
-        exists = ((self.df_remedies['common_col'].str.lower() == common_name.lower()) |
-                  (self.df_remedies['latin_col'].str.lower() == latin_name.lower())).any()
-        if not exists:
-            new_row = {'common_col': common_name, 'latin_col': latin_name}
-            self.df_remedies = pd.concat([self.df_remedies, pd.DataFrame([new_row])], ignore_index=True)
-            self.df_remedies.to_excel(self.remedies_file, index=False, engine='openpyxl')
+        # logged first: remedies.xlsx is only rewritten on exit
+        self.wal.append(MEDICINE, common=common_name.strip(), latin=latin_name.strip())
+        self.apply_new_medicine(common_name, latin_name)
+
+    def apply_new_medicine(self, common_name, latin_name):
+        rid = self.remedy_store.add(common_name, latin_name)
+        if rid is not None:
+            self.remedy_names[0][rid] = common_name.strip()
+            self.remedy_names[1][rid] = latin_name.strip()
+            self.search_engine.add(common_name.strip(), latin_name.strip(), rid=rid)
             logging.info(f"New medicine added: {common_name} / {latin_name}")
 
-    def update_selected_medicine(self):
+    def export_remedies(self):
+        if self.remedy_store is None:
+            return
+        try:
+            if self.remedy_store.dirty:
+                self.remedy_store.export_to_excel(self.remedies_file)
+            self.wal.checkpoint(MEDICINE)
+        except PermissionError:
+            logging.warning("remedies.xlsx is locked; new medicines will be exported on next exit.")
+        except Exception as e:
+            logging.error(f"Failed to export remedies.xlsx: {e}")
+
+    def export_records(self, force=False):
+        """Regenerate records.xlsx from the records journal if it is out of date."""
+        self.records_writer.flush(timeout=2)
+        if not force and not self.records_journal.stale:
+            return
+        try:
+            count = self.records_journal.export_excel()
+            self.status.setText(f"Exported {count} records to records.xlsx.")
+        except PermissionError:
+            logging.warning("records.xlsx is locked; records will be exported on next exit.")
+            if force:
+                QMessageBox.warning(self, "File Locked", "Please close 'records.xlsx' and export again.")
+        except Exception as e:
+            logging.error(f"Failed to export records.xlsx: {e}")
+
+    def open_export_dialog(self):
+        self.records_writer.flush(timeout=2)
+        dialog = QtWidgets.QDialog(self)
+        dialog.setWindowTitle("Export Records")
+        form = QtWidgets.QFormLayout(dialog)
+        shop_input = QtWidgets.QComboBox()
+        shop_input.addItem("All shops", None)
+        for shop in self.records_repo.shops():
+            shop_input.addItem(shop, shop)
+        date_check = QtWidgets.QCheckBox("Only labels printed between")
+        from_date = QtWidgets.QDateEdit(QtCore.QDate.currentDate().addMonths(-1))
+        to_date = QtWidgets.QDateEdit(QtCore.QDate.currentDate())
+        for edit in (from_date, to_date):
+            edit.setCalendarPopup(True)
+            edit.setDisplayFormat("yyyy-MM-dd")
+        dates = QtWidgets.QHBoxLayout()
+        dates.addWidget(from_date)
+        dates.addWidget(QtWidgets.QLabel("and"))
+        dates.addWidget(to_date)
+        form.addRow("Shop:", shop_input)
+        form.addRow(date_check, dates)
+        buttons = QtWidgets.QDialogButtonBox(QtWidgets.QDialogButtonBox.Ok | QtWidgets.QDialogButtonBox.Cancel)
+        buttons.accepted.connect(dialog.accept)
+        buttons.rejected.connect(dialog.reject)
+        form.addRow(buttons)
+        if dialog.exec_() != QtWidgets.QDialog.Accepted:
+            return
+
+        shop = shop_input.currentData()
+        start = end = None
+        if date_check.isChecked():
+            start = from_date.date().toString("yyyy-MM-dd")
+            end = to_date.date().addDays(1).toString("yyyy-MM-dd")
+        if shop is None and start is None:
+            # everything: that is records.xlsx itself
+            self.export_records(force=True)
+            return
+        path, _ = QtWidgets.QFileDialog.getSaveFileName(
+            self, "Export Records", os.path.join(self.records_folder, "records_export.xlsx"), "Excel (*.xlsx)")
+        if not path:
+            return
+        progress = QtWidgets.QProgressDialog("Exporting records...", None, 0, 100, self)
+        progress.setWindowModality(QtCore.Qt.WindowModal)
+        progress.setMinimumDuration(500)
+
+        def report(done, total):
+            progress.setValue(done * 100 // max(total, 1))
+            QtWidgets.QApplication.processEvents()
+
+        try:
+            count = self.records_journal.export_excel(path, start, end, shop, report)
+            self.status.setText(f"Exported {count} records to {os.path.basename(path)}.")
+        except PermissionError:
+            QMessageBox.warning(self, "File Locked", f"Please close '{os.path.basename(path)}' and export again.")
+        except Exception as e:
+            logging.error(f"Failed to export records to {path}: {e}")
+            QMessageBox.critical(self, "Export Failed", str(e))
+        finally:
+            progress.close()
+
+    def open_reprint_dialog(self):
+        self.records_writer.flush(timeout=2)
+        dialog = QtWidgets.QDialog(self)
+        dialog.setWindowTitle("Find / Reprint Label")
+        dialog.resize(int(1000 * self.scaling), int(550 * self.scaling))
+        layout = QtWidgets.QVBoxLayout(dialog)
+
+        filters = QtWidgets.QHBoxLayout()
+        medicine_input = QtWidgets.QLineEdit()
+        medicine_input.setPlaceholderText("Medicine starts with...")
+        shop_input = QtWidgets.QComboBox()
+        shop_input.addItem("All shops", None)
+        for shop in self.records_repo.shops():
+            shop_input.addItem(shop, shop)
+        date_check = QtWidgets.QCheckBox("Printed from")
+        from_date = QtWidgets.QDateEdit(QtCore.QDate.currentDate().addDays(-7))
+        to_date = QtWidgets.QDateEdit(QtCore.QDate.currentDate())
+        for edit in (from_date, to_date):
+            edit.setCalendarPopup(True)
+            edit.setDisplayFormat("yyyy-MM-dd")
+        filters.addWidget(medicine_input, 2)
+        filters.addWidget(shop_input, 1)
+        filters.addWidget(date_check)
+        filters.addWidget(from_date)
+        filters.addWidget(QtWidgets.QLabel("to"))
+        filters.addWidget(to_date)
+        layout.addLayout(filters)
+
+        columns = ["Timestamp", "Medicine", "Potency", "Dose", "Time", "Shop", "Branch/Phone"]
+        table = QtWidgets.QTableWidget(0, len(columns))
+        table.setHorizontalHeaderLabels(columns)
+        table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        table.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        table.setSelectionMode(QtWidgets.QAbstractItemView.SingleSelection)
+        table.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(table)
+        found_label = QtWidgets.QLabel("")
+        layout.addWidget(found_label)
+
+        buttons = QtWidgets.QDialogButtonBox(QtWidgets.QDialogButtonBox.Close)
+        load_btn = buttons.addButton("Load into Form", QtWidgets.QDialogButtonBox.ActionRole)
+        reprint_btn = buttons.addButton("Reprint", QtWidgets.QDialogButtonBox.ActionRole)
+        buttons.rejected.connect(dialog.reject)
+        layout.addWidget(buttons)
+
+        results = []
+
+        def refresh():
+            start = end = None
+            if date_check.isChecked():
+                start = from_date.date().toString("yyyy-MM-dd")
+                end = to_date.date().addDays(1).toString("yyyy-MM-dd")
+            results[:] = self.records_repo.query(medicine=medicine_input.text(), shop=shop_input.currentData(),
+                                                 start=start, end=end, limit=500)
+            table.setRowCount(len(results))
+            for row, rec in enumerate(results):
+                for col, key in enumerate(columns):
+                    table.setItem(row, col, QtWidgets.QTableWidgetItem(str(rec.get(key, ""))))
+            found_label.setText(f"{len(results)} label(s)" + (" (first 500 shown)" if len(results) == 500 else ""))
+
+        def load_selected():
+            row = table.currentRow()
+            if row < 0:
+                return False
+            self.fill_form_from_record(results[row])
+            return True
+
+        def reprint():
+            if load_selected():
+                dialog.accept()
+                self.print_label()
+
+        medicine_input.textChanged.connect(refresh)
+        shop_input.currentIndexChanged.connect(refresh)
+        date_check.toggled.connect(refresh)
+        from_date.dateChanged.connect(refresh)
+        to_date.dateChanged.connect(refresh)
+        table.doubleClicked.connect(lambda _: load_selected() and dialog.accept())
+        load_btn.clicked.connect(lambda: load_selected() and dialog.accept())
+        reprint_btn.clicked.connect(reprint)
+        refresh()
+        dialog.exec_()
+
+    def open_stats_dialog(self):
+        self.records_writer.flush(timeout=2)
+        dialog = QtWidgets.QDialog(self)
+        dialog.setWindowTitle("Label Statistics")
+        dialog.resize(int(900 * self.scaling), int(600 * self.scaling))
+        layout = QtWidgets.QVBoxLayout(dialog)
+        tabs = QtWidgets.QTabWidget()
+        layout.addWidget(tabs)
+
+        def counts_table(title, rows):
+            box = QtWidgets.QGroupBox(title)
+            box_layout = QtWidgets.QVBoxLayout(box)
+            table = QtWidgets.QTableWidget(len(rows), 2)
+            table.setHorizontalHeaderLabels(["", "Labels"])
+            table.verticalHeader().setVisible(False)
+            table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+            table.horizontalHeader().setSectionResizeMode(0, QtWidgets.QHeaderView.Stretch)
+            for row, (key, n) in enumerate(rows):
+                table.setItem(row, 0, QtWidgets.QTableWidgetItem(str(key)))
+                table.setItem(row, 1, QtWidgets.QTableWidgetItem(str(n)))
+            box_layout.addWidget(table)
+            return box
+
+        def populate():
+            tabs.clear()
+            now = datetime.now()
+            for name, period in [("Today", now.strftime("%Y-%m-%d")), ("This Month", now.strftime("%Y-%m"))]:
+                page = QtWidgets.QWidget()
+                grid = QtWidgets.QGridLayout(page)
+                grid.addWidget(QtWidgets.QLabel(f"Labels printed: {self.records_repo.total(period)}"), 0, 0, 1, 3)
+                grid.addWidget(counts_table("Top remedies", self.records_repo.top(period, "medicine")), 1, 0)
+                grid.addWidget(counts_table("Potencies", self.records_repo.top(period, "potency")), 1, 1)
+                grid.addWidget(counts_table("Shops", self.records_repo.top(period, "shop")), 1, 2)
+                grid.addWidget(counts_table("Branches", self.records_repo.top(period, "branch")), 2, 0)
+                hours = sorted(self.records_repo.per_hour(period).items())
+                grid.addWidget(counts_table("Labels per hour", [(f"{h}:00", n) for h, n in hours]), 2, 1, 1, 2)
+                tabs.addTab(page, name)
+
+        def rebuild():
+            self.records_writer.flush(timeout=2)
+            count = self.records_repo.rebuild(self.records_journal)
+            self.status.setText(f"Re-indexed {count} records.")
+            populate()
+
+        buttons = QtWidgets.QDialogButtonBox(QtWidgets.QDialogButtonBox.Close)
+        rebuild_btn = buttons.addButton("Rebuild from Records", QtWidgets.QDialogButtonBox.ActionRole)
+        rebuild_btn.setToolTip("Recount everything from the records journal")
+        rebuild_btn.clicked.connect(rebuild)
+        buttons.rejected.connect(dialog.reject)
+        layout.addWidget(buttons)
+        populate()
+        dialog.exec_()
+
+    def fill_form_from_record(self, record):
+        self.medicine_search.setText(record.get("Medicine", ""))
+        self.potency_input.setCurrentText(record.get("Potency", ""))
+        self.dose_input.setCurrentText(record.get("Dose", ""))
+        self.time_input.setCurrentText(record.get("Time", ""))
+        self.shop_input.setCurrentText(record.get("Shop", ""))
+        self.branch_phone_input.setCurrentText(record.get("Branch/Phone", ""))
+        self._predicted = {}
+        self.update_selected_medicine(predict=False)
+
+    def closeEvent(self, event):
+        self.export_remedies()
+        self.autocomplete_saver.close()
+        self.records_writer.close()
+        self.export_records()
+        event.accept()
+
+    def update_selected_medicine(self, predict=True):
         med_name = self.medicine_search.text().upper()
         self.selected_medicine_label.setText(f"MEDICINE: {med_name}")
+        if predict:
+            self.predict_details(new_medicine=True)
         self.update_preview()
 
-    def update_preview(self):
+    def predict_details(self, new_medicine=False):
+        """Pre-select the potency, dose and time most often printed with this medicine.
+
+        For a newly chosen medicine every field with history is replaced (values
+        left from the previous label belong to another medicine); otherwise only
+        fields still holding a prediction are, conditioned on what staff entered.
+        """
         med_name = self.medicine_search.text().strip().upper()
-        potency = self.potency_input.currentText().upper()
-        dose = self.dose_input.currentText()
-        time_val = self.time_input.currentText()
-        shop = self.shop_input.currentText().upper()
-        branch_phone = self.branch_phone_input.currentText().upper()
-        words = med_name.split()
-        line1, line2 = "", ""
-        for word in words:
-            if len(line1 + " " + word) <= 18:
-                line1 += (" " + word).strip()
-            else:
-                line2 += (" " + word).strip()
-        self.preview_line1.setText(line1)
-        self.preview_line2.setText(f"{line2} {potency}".strip())
-        self.preview_line3.setText(f"{dose}   {time_val}")
-        self.preview_line4.setText(f"{shop}")
-        self.preview_line5.setText(f"{branch_phone}")
+        if self._predicting or not med_name:
+            return
+        # this prediction supersedes one still waiting for potency typing to pause
+        self.predict_timer.stop()
+        combos = {"Potency": self.potency_input, "Dose": self.dose_input, "Time": self.time_input}
+        entered = {} if new_medicine else {
+            field: combo.currentText().strip() for field, combo in combos.items()
+            if combo.currentText().strip() and combo.currentText() != self._predicted.get(field)}
+        predicted = self.records_repo.predict(med_name, entered.get("Potency", "").upper(), entered.get("Dose"))
+        self._predicting = True
+        try:
+            for field, combo in combos.items():
+                value = predicted.get(field)
+                if field in entered or (value is None and combo.currentText() != self._predicted.get(field)):
+                    # staff's own value, kept
+                    self._predicted.pop(field, None)
+                    continue
+                combo.setCurrentText(value or "")
+                self._predicted[field] = value or ""
+        finally:
+            self._predicting = False
+
+    def potency_completions(self, text):
+        """Potencies to offer for `text`: printed ones starting with it, most used first, then common
+        potencies with a spelling starting with it ("1000C" -> "1M") that were not printed in any spelling.
+        """
+        typed = text.strip().upper()
+        printed = [p for p in self.autocomplete_data.ranked("potency") if p.upper().startswith(typed)]
+        used = {potency_key(p) for p in printed}
+        common = complete(typed) if typed else COMMON_POTENCIES
+        return printed + [p for p in common if potency_key(p) not in used]
+
+    def check_potency(self, text):
+        """Mark the potency field when its text is not a potency the parser understands."""
+        edit = self.potency_input.lineEdit()
+        if not text.strip() or parse_potency(text):
+            edit.setStyleSheet("")
+            edit.setToolTip("")
+        else:
+            edit.setStyleSheet("color: darkred;")
+            edit.setToolTip("Not a recognised potency (e.g. 30C, 200CH, 1M, 6X, LM 3, Q)")
+
+    def label_layout(self):
+        return compile_layout(50, 30, self.font_size_med, self.top_offset)
+
+    def label_record(self):
+        """The label currently in the form, keyed like a journal record."""
+        return {"Medicine": self.medicine_search.text().strip().upper(),
+                "Potency": self.potency_input.currentText().upper(),
+                "Dose": self.dose_input.currentText(),
+                "Time": self.time_input.currentText(),
+                "Shop": self.shop_input.currentText().upper(),
+                "Branch/Phone": self.branch_phone_input.currentText().upper()}
+
+    def update_preview(self):
+        # same layout as the printed label, so the preview wraps the name where the print will
+        layout = self.label_layout()
+        texts = layout.row_texts(layout.ops(self.label_record()))
+        for label, text in zip([self.preview_line1, self.preview_line2, self.preview_line3,
+                                self.preview_line4, self.preview_line5], texts):
+            label.setText(text)
 
     def update_label_settings(self):
         self.font_size_med = self.font_size_spin.value()
@@ -355,15 +736,13 @@ class HomeoLabelApp(QtWidgets.QWidget):
             QMessageBox.critical(self, "Error", f"Print failed: {e}")
             self.status.setText(f"Error: {e}")
 
-    def print_direct(self):
-        if not self.medicine_search.text().strip():
-            QMessageBox.warning(self, "Missing Info", "Please enter or select a medicine before printing.")
-            return
+    def ready_printer(self):
+        """The selected printer if it is ready, else None after telling the user why."""
         self.refresh_printers()
         printer_name = self.printer_combo.currentText()
         if not printer_name:
             QMessageBox.warning(self, "No Printer", "Please select a printer first.")
-            return
+            return None
         if not self.check_printer_ready(printer_name):
             QMessageBox.critical(self, "Printer Error",
                 f"Printer '{printer_name}' is not ready or not connected via USB.\n"
@@ -371,15 +750,29 @@ class HomeoLabelApp(QtWidgets.QWidget):
                 "• Try a different USB port/cable\n"
                 "• Print a test page from Windows\n"
                 "• Use 'Refresh Printers' in this app")
-            return
+            return None
+        return printer_name
+
+    def send_pdf(self, printer_name, pdf_file, render, sent_message):
+        """Render a PDF with `render()` and send it to the printer as one job.
+
+        Falls back to opening it for manual printing. Returns True if the PDF was rendered.
+        """
+        try:
+            render()
+        except Exception as e:
+            # nothing new to print; opening the file would show whatever an earlier print left there
+            logging.error(f"Label PDF could not be written ({pdf_file}): {e}")
+            QMessageBox.critical(self, "Print Failed", f"Could not create the label PDF: {e}")
+            self.status.setText(f"Error: {e}")
+            return False
         try:
-            pdf_file = os.path.join(self.records_folder, "label.pdf")
-            self.generate_pdf(pdf_file)
             result = win32api.ShellExecute(0, "printto", pdf_file, f'"{printer_name}"', ".", 0)
             if int(result) <= 32:
                 raise OSError(f"ShellExecute error: {result}")
-            self.status.setText(f"Label sent to {printer_name}.")
-            logging.info(f"Label sent to printer: {printer_name}")
+            self.status.setText(sent_message)
+            logging.info(f"{sent_message} ({pdf_file})")
+            return True
         except Exception as e:
             logging.error(f"Direct print failed: {e}")
             QMessageBox.critical(self, "Direct Print Failed",
@@ -394,77 +787,98 @@ class HomeoLabelApp(QtWidgets.QWidget):
             except Exception as e2:
                 logging.error(f"Failed to open PDF for manual print: {e2}")
                 self.status.setText("PDF manual print also failed.")
+        return True
+
+    def print_direct(self):
+        if not self.medicine_search.text().strip():
+            QMessageBox.warning(self, "Missing Info", "Please enter or select a medicine before printing.")
+            return
+        printer_name = self.ready_printer()
+        if not printer_name:
+            return
+        pdf_file = os.path.join(self.records_folder, "label.pdf")
+        self.send_pdf(printer_name, pdf_file, lambda: self.generate_pdf(pdf_file), f"Label sent to {printer_name}.")
+
+    def canonical_label_record(self):
+        # a known variant spelling prints (and is counted) as its canonical form
+        for field, combo in [("potency", self.potency_input), ("dose", self.dose_input), ("time", self.time_input),
+                             ("shop", self.shop_input), ("branch", self.branch_phone_input)]:
+            canonical = self.autocomplete_data.resolve(field, combo.currentText())
+            if canonical != combo.currentText():
+                combo.setCurrentText(canonical)
+        return self.label_record()
 
     def generate_pdf(self, pdf_file):
-        med_name = self.medicine_search.text().strip().upper()
-        potency = self.potency_input.currentText().upper()
-        dose = self.dose_input.currentText()
-        time_val = self.time_input.currentText()
-        shop = self.shop_input.currentText().upper()
-        branch_phone = self.branch_phone_input.currentText().upper()
-        if not med_name:
+        record = self.canonical_label_record()
+        if not record["Medicine"]:
             QMessageBox.warning(self, "Missing Info", "Please enter or select a medicine before printing.")
             return
-        record = {"Medicine": med_name, "Potency": potency, "Dose": dose,
-                  "Time": time_val, "Shop": shop, "Branch/Phone": branch_phone}
-        self.record_buffer.append(record)
-        if len(self.record_buffer) >= 10 or pdf_file:
-            try:
-                if os.path.exists(self.excel_file):
-                    df_records = pd.read_excel(self.excel_file, engine="openpyxl")
-                    df_records = pd.concat([df_records, pd.DataFrame(self.record_buffer)], ignore_index=True)
-                else:
-                    df_records = pd.DataFrame(self.record_buffer)
-                df_records.to_excel(self.excel_file, index=False, engine="openpyxl")
-                self.record_buffer.clear()
-                logging.info("Records buffered and saved.")
-            except PermissionError:
-                QMessageBox.warning(self, "File Locked", "Please close 'records.xlsx' before saving again.")
-                logging.warning("Excel file permission error encountered.")
-                return
-        for field, value in [("potency", potency), ("dose", dose), ("time", time_val),
-                             ("shop", shop), ("branch", branch_phone)]:
-            if value:
-                lst = self.autocomplete_data.setdefault(field, [])
-                if value not in lst:
-                    lst.append(value)
-        self.save_autocomplete()
-        width_mm, height_mm = 50, 30
-        c = canvas.Canvas(pdf_file, pagesize=(width_mm * mm, height_mm * mm))
-        c.setLineWidth(1)
-        c.rect(2 * mm, 2 * mm, (width_mm - 4) * mm, (height_mm - 4) * mm)
-        y = height_mm * mm - self.top_offset * mm
-        c.setFont("Helvetica-Bold", self.font_size_med)
-        words = med_name.split()
-        line1, line2 = "", ""
-        for word in words:
-            if len(line1 + " " + word) <= 18:
-                line1 += (" " + word).strip()
-            else:
-                line2 += (" " + word).strip()
-        c.drawCentredString((width_mm / 2) * mm, y, line1)
-        y -= 5 * mm
-        c.drawCentredString((width_mm / 2) * mm, y, f"{line2} {potency}".strip())
-        y -= 6 * mm
-        dose = dose if dose else ''
-        time_val = time_val if time_val else ''
-        dose_width = stringWidth(dose, "Helvetica-Bold", 8)
-        time_width = stringWidth(time_val, "Helvetica", 8)
-        gap = 6  # points spacing
-        total_width = dose_width + (gap if dose and time_val else 0) + time_width
-        center_x = (width_mm / 2) * mm
-        start_x = center_x - total_width / 2
-        c.setFont("Helvetica-Bold", 8)
-        c.drawString(start_x, y, dose)
-        if time_val:
-            c.setFont("Helvetica", 8)
-            c.drawString(start_x + dose_width + gap, y, time_val)
-        y -= 5 * mm
-        c.setFont("Helvetica-Bold", 7)
-        c.drawCentredString((width_mm / 2) * mm, y, f"{shop}")
-        y -= 4 * mm
-        c.drawCentredString((width_mm / 2) * mm, y, f"{branch_phone}")
-        c.save()
+        self.write_labels(pdf_file, [record])
+
+    def write_labels(self, pdf_file, records):
+        """Render the labels into `pdf_file`, one page per label, then save their records."""
+        # only labels that made it into a PDF are recorded, so a failed render can simply be retried
+        render_pdf(pdf_file, self.label_layout(), records)
+        timestamp = datetime.now().isoformat(timespec="seconds")
+        uses = []
+        for record in records:
+            record["Timestamp"] = timestamp
+            # journaled by the writer thread; the labels print without waiting for disk
+            self.records_writer.submit(record)
+            uses += [("potency", record["Potency"]), ("dose", record["Dose"]), ("time", record["Time"]),
+                     ("shop", record["Shop"]), ("branch", record["Branch/Phone"])]
+        self.autocomplete_saver.record(uses)
+
+    # ------------------ Print queue ------------------
+    def add_to_queue(self):
+        record = self.canonical_label_record()
+        if not record["Medicine"]:
+            QMessageBox.warning(self, "Missing Info", "Please enter or select a medicine before queueing.")
+            return
+        self.print_queue_records.append(record)
+        text = " ".join(v for v in (record["Medicine"], record["Potency"], record["Dose"], record["Time"]) if v)
+        self.queue_list.addItem(text)
+        self.status.setText(f"{len(self.print_queue_records)} labels queued.")
+
+    def remove_from_queue(self):
+        row = self.queue_list.currentRow()
+        if row < 0:
+            return
+        del self.print_queue_records[row]
+        self.queue_list.takeItem(row)
+
+    def clear_queue(self):
+        self.print_queue_records = []
+        self.queue_list.clear()
+
+    def print_queue(self):
+        """Print every queued label as a single job: one PDF, one page per label."""
+        if not self.print_queue_records:
+            QMessageBox.information(self, "Print Queue", "The print queue is empty.")
+            return
+        printer_name = self.ready_printer()
+        if not printer_name:
+            return
+        records = self.print_queue_records
+        pdf_file = self.new_queue_pdf()
+        if self.send_pdf(printer_name, pdf_file, lambda: self.write_labels(pdf_file, records),
+                         f"{len(records)} labels sent to {printer_name}."):
+            # rendered and saved as printed; the PDF stays open for manual printing if sending failed
+            self.clear_queue()
+
+    def new_queue_pdf(self):
+        """A fresh PDF path for a batch, removing earlier ones that are done with."""
+        # the PDF of an earlier batch may still be spooling or open (and locked) for manual printing
+        cutoff = datetime.now().timestamp() - 600
+        for name in os.listdir(self.records_folder):
+            path = os.path.join(self.records_folder, name)
+            if name.startswith("queue-") and name.endswith(".pdf"):
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                except OSError:
+                    pass
+        return os.path.join(self.records_folder, f"queue-{datetime.now():%Y%m%d-%H%M%S-%f}.pdf")
 
     def refresh_printers(self):
         self.printer_combo.clear()
@@ -71,8 +71,8 @@ else:
 
 # (Font registration handled above with a safe lookup; no unconditional register here.)
 
-# 2. Fuzzy search package
-from rapidfuzz import fuzz, process
+# 2. Shared search engine (rapidfuzz-backed fuzzy matching)
+from remedy_search import FUZZY, SearchEngine
 
 try:
     import pandas as pd
@@ -145,6 +145,7 @@ class HomeBox(BoxLayout):
         # popup instance placeholder for font chooser
         self._font_popup = None
         self.df = None
+        self.engine = None
         self.latin_col = 'latin_col'
         self.common_col = 'common_col'
         # config file to persist chosen font
@@ -187,6 +188,7 @@ class HomeBox(BoxLayout):
         df = pd.read_excel(path, engine='openpyxl')
         df.rename(columns={c: c.lower().strip() for c in df.columns}, inplace=True)
         self.df = df[['latin_col', 'common_col']].dropna(how='any')
+        self.engine = SearchEngine(self.df[self.common_col], self.df[self.latin_col])
 
     def load_excel(self):
         if not PANDAS_AVAILABLE:
@@ -274,40 +276,38 @@ class HomeBox(BoxLayout):
             self.status_text = 'Type a remedy name.'
             return
         if self.df is not None:
-            # AI fuzzy search on common_col (Bengali/English, all text)
-            names = self.df[self.common_col].astype(str).tolist()
+            # AI fuzzy search on both names (Bengali/English, all text)
             # Get up to 5 best matches above 60% similarity
-            found = process.extract(query, names, scorer=fuzz.WRatio, limit=5)
+            found = self.engine.search(query, FUZZY, limit=5)
             count = 0
-            for name, score, idx in found:
-                if score >= 60:
-                    common = str(self.df.iloc[idx][self.common_col])
-                    latin = str(self.df.iloc[idx][self.latin_col])
-                    # Build a two-column row: left = common (Bengali/English), right = latin
-                    from kivy.uix.boxlayout import BoxLayout as KBox
-                    row = KBox(orientation='horizontal', size_hint_y=None, height='32dp', spacing=6)
-
-                    def contains_bengali(s):
-                        if not s:
-                            return False
-                        for ch in s:
-                            if '\u0980' <= ch <= '\u09FF':
-                                return True
+            for idx in found:
+                common = str(self.df.iloc[idx][self.common_col])
+                latin = str(self.df.iloc[idx][self.latin_col])
+                # Build a two-column row: left = common (Bengali/English), right = latin
+                from kivy.uix.boxlayout import BoxLayout as KBox
+                row = KBox(orientation='horizontal', size_hint_y=None, height='32dp', spacing=6)
+
+                def contains_bengali(s):
+                    if not s:
                         return False
-
-                    # Common name label: use Bengali font when the text contains Bengali characters
-                    common_kwargs = {'text': f'কমন: {common}', 'size_hint_x': 0.6}
-                    if BENGALI_FONT_AVAILABLE and contains_bengali(common):
-                        common_kwargs['font_name'] = FONT_NAME
-                    common_lbl = Label(**common_kwargs)
-
-                    # Latin name label: use default font (keeps Latin glyphs rendered as usual)
-                    latin_lbl = Label(text=f'লাতিন: {latin}', size_hint_x=0.4)
-
-                    row.add_widget(common_lbl)
-                    row.add_widget(latin_lbl)
-                    self.ids.results_box.add_widget(row)
-                    count += 1
+                    for ch in s:
+                        if '\u0980' <= ch <= '\u09FF':
+                            return True
+                    return False
+
+                # Common name label: use Bengali font when the text contains Bengali characters
+                common_kwargs = {'text': f'কমন: {common}', 'size_hint_x': 0.6}
+                if BENGALI_FONT_AVAILABLE and contains_bengali(common):
+                    common_kwargs['font_name'] = FONT_NAME
+                common_lbl = Label(**common_kwargs)
+
+                # Latin name label: use default font (keeps Latin glyphs rendered as usual)
+                latin_lbl = Label(text=f'লাতিন: {latin}', size_hint_x=0.4)
+
+                row.add_widget(common_lbl)
+                row.add_widget(latin_lbl)
+                self.ids.results_box.add_widget(row)
+                count += 1
             if count:
                 self.status_text = f'AI found {count} remedy/remedies.'
             else:
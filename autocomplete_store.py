@@ -0,0 +1,415 @@
+"""
+Frequency-ranked autocomplete values for the label form.
+
+Each field (potency, dose, time, shop, branch) maps value -> usage in a
+dict, so checking or recording a value is O(1). Usage is a hit count, the
+last-used time and an exponentially decayed weight: every use adds 1 and
+the weight halves every `half_life` seconds, so values used often *and*
+recently rank first. A field keeps at most `max_values` values; adding one
+beyond that evicts the value with the lowest decayed weight.
+
+autocomplete.json keeps its old shape ({field: [values]}, now ranked) so
+older copies of the app can still read it; the usage data lives under the
+"_usage" key. A file without it is migrated on load: its values keep their
+order and start with one hit each.
+
+Spelling variants of one value ("HOMEO MAHANAGR ,SHAPOORJI" and "HOMEO
+MAHANAGAR SHAPOORJI") are found by `clusters`: values sharing a normalized
+key (case, spacing, punctuation) group directly, and the rest are compared
+with rapidfuzz only within blocks of values that have the same numbers and
+initial, so the pass never compares every pair. `merge` folds variants
+into the most used value and records them in an alias map, which
+`resolve` consults in O(1) when a variant is typed again. Potencies are
+keyed by their parsed value (see `potency`), so "1000CH" and "1M" share a
+key however differently they are spelled.
+
+`AutocompleteSaver` persists the store from a background thread: uses from
+a burst of prints are coalesced into one write-ahead log append, and
+autocomplete.json is only rewritten (atomically) when it is behind the
+store and the log has grown, or on exit.
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+from mutation_log import AUTOCOMPLETE
+from potency import potency_key
+from remedy_catalog import normalize_name
+
+try:
+    from rapidfuzz import fuzz, process
+    RAPIDFUZZ_AVAILABLE = True
+except ImportError:
+    RAPIDFUZZ_AVAILABLE = False
+
+HALF_LIFE = 30 * 24 * 3600
+MAX_VALUES = 200
+USAGE_KEY = "_usage"
+ALIASES_KEY = "_aliases"
+# Top-level keys of autocomplete.json that are not fields.
+RESERVED_KEYS = (USAGE_KEY, ALIASES_KEY)
+# fuzz.ratio of two normalized keys for them to count as spellings of one value
+# ("5 gloubes" ~ "5 globules" scores 84; "30 ml" vs "30 mg" only 80)
+SIMILARITY_CUTOFF = 84
+
+
+def value_key(value):
+    """Key shared by case, spacing and punctuation variants: "8AM/12N" -> "8 am 12 n".
+
+    Punctuation between two digits is kept, so "1/2 CAP" and "1-2 CAP" stay apart.
+    """
+    key = normalize_name(value).replace("_", " ")
+    key = re.sub(r"(?<=\d)(?=[^\W\d])|(?<=[^\W\d])(?=\d)", " ", key)
+    key = re.sub(r"(?<!\d)[^\w\s]+|[^\w\s]+(?!\d)", " ", key)
+    return " ".join(key.split())
+
+
+def field_key(field, value):
+    """`value_key`, except that a potency that parses is keyed by its value ("1M" and "1000CH" -> "C:1000")."""
+    if field == "potency":
+        key = potency_key(value)
+        if key:
+            return key
+    return value_key(value)
+
+
+def _block(key):
+    # Only values with the same numbers can be variants ("8 am 3 pm" is not "8 am 4 pm").
+    numbers = tuple(re.findall(r"\d+", key))
+    letters = re.sub(r"[\d ]+", "", key)
+    return numbers, letters[:1]
+
+
+def cluster_values(values, score_cutoff=SIMILARITY_CUTOFF, key=value_key):
+    """Groups of near-duplicate values, each in the order given; singletons are left out."""
+    parent = list(range(len(values)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(i, j):
+        i, j = find(i), find(j)
+        if i != j:
+            parent[max(i, j)] = min(i, j)
+
+    first_with_key, blocks = {}, {}
+    for i, value in enumerate(values):
+        k = key(value)
+        if k in first_with_key:
+            union(first_with_key[k], i)
+        else:
+            first_with_key[k] = i
+            blocks.setdefault(_block(k), []).append(i)
+    if RAPIDFUZZ_AVAILABLE:
+        keys = {i: k for k, i in first_with_key.items()}
+        for members in blocks.values():
+            if len(members) < 2:
+                continue
+            block_keys = [keys[i] for i in members]
+            scores = process.cdist(block_keys, block_keys, scorer=fuzz.ratio, score_cutoff=score_cutoff)
+            for a in range(len(members)):
+                for b in range(a + 1, len(members)):
+                    if scores[a][b]:
+                        union(members[a], members[b])
+    groups = {}
+    for i in range(len(values)):
+        groups.setdefault(find(i), []).append(values[i])
+    return [g for g in groups.values() if len(g) > 1]
+
+
+class AutocompleteStore:
+    def __init__(self, max_values=MAX_VALUES, half_life=HALF_LIFE):
+        self.max_values = max_values
+        self.half_life = half_life
+        # field -> {value: [hits, last used (epoch s), decayed weight at last use]}
+        self._fields = {}
+        # field -> {field_key of a merged variant: canonical value}
+        self._aliases = {}
+
+    @classmethod
+    def from_json(cls, data, now=None, **kwargs):
+        """Load an autocomplete.json document, migrating plain {field: [values]} files."""
+        store = cls(**kwargs)
+        now = time.time() if now is None else now
+        usage = data.get(USAGE_KEY)
+        # a damaged or hand-merged file may hold anything here; fall back to migrating the lists
+        usage = usage if isinstance(usage, dict) else {}
+        for field, values in data.items():
+            if field in RESERVED_KEYS or not isinstance(values, list):
+                continue
+            known = usage.get(field)
+            known = known if isinstance(known, dict) else {}
+            entries = store._fields.setdefault(field, {})
+            for value in values:
+                if not isinstance(value, str) or value in entries:
+                    continue
+                # Values added by an app without usage tracking start with a single use.
+                entry = known.get(value)
+                if not (isinstance(entry, list) and len(entry) == 3):
+                    entry = (1, now, 1.0)
+                hits, last_used, weight = entry
+                entries[value] = [hits, last_used, weight]
+        aliases = data.get(ALIASES_KEY)
+        for field, field_aliases in (aliases.items() if isinstance(aliases, dict) else ()):
+            if isinstance(field_aliases, dict):
+                store._aliases[field] = dict(field_aliases)
+        return store
+
+    def to_json(self):
+        """autocomplete.json document: ranked lists per field plus the usage data."""
+        now = time.time()
+        data = {field: self.ranked(field, now=now) for field in self._fields}
+        data[USAGE_KEY] = {field: {v: list(e) for v, e in entries.items()}
+                           for field, entries in self._fields.items()}
+        if self._aliases:
+            data[ALIASES_KEY] = self._aliases
+        return data
+
+    def __contains__(self, item):
+        field, value = item
+        return value in self._fields.get(field, ())
+
+    def _score(self, entry, now):
+        hits, last_used, weight = entry
+        return weight * 0.5 ** (max(now - last_used, 0) / self.half_life)
+
+    def touch(self, field, value, when=None):
+        """Record one use of `value`. Returns True if the value was new to the field."""
+        when = time.time() if when is None else when
+        entries = self._fields.setdefault(field, {})
+        entry = entries.get(value)
+        if entry is not None:
+            entry[:] = [entry[0] + 1, when, self._score(entry, when) + 1.0]
+            return False
+        if len(entries) >= self.max_values:
+            self._evict(entries, when)
+        entries[value] = [1, when, 1.0]
+        return True
+
+    def replay(self, field, value, when):
+        """`touch` for a logged use, skipped if the loaded usage already includes it."""
+        value = self.resolve(field, value)
+        entry = self._fields.get(field, {}).get(value)
+        if entry is not None and (when is None or entry[1] >= when):
+            return
+        self.touch(field, value, when)
+
+    def _add_usage(self, target, entry):
+        # Sum two usages of one value, decaying both to the later use.
+        last_used = max(target[1], entry[1])
+        weight = self._score(target, last_used) + self._score(entry, last_used)
+        target[:] = [target[0] + entry[0], last_used, weight]
+
+    def update(self, other):
+        """Fold the usage of another store (another copy's autocomplete.json) into this one."""
+        now = time.time()
+        for field, theirs in other._fields.items():
+            entries = self._fields.setdefault(field, {})
+            for value, entry in theirs.items():
+                if value in entries:
+                    self._add_usage(entries[value], entry)
+                else:
+                    entries[value] = list(entry)
+            while len(entries) > self.max_values:
+                self._evict(entries, now)
+        for field, theirs in other._aliases.items():
+            aliases = self._aliases.setdefault(field, {})
+            for key, canonical in theirs.items():
+                aliases.setdefault(key, canonical)
+        # a value either copy knows as a variant is folded into its canonical form here too
+        for field in set(other._fields) | set(other._aliases):
+            for value in list(self._fields.get(field, ())):
+                canonical = self.resolve(field, value)
+                if canonical != value:
+                    self.merge(field, canonical, [value])
+
+    def _evict(self, entries, now):
+        # Least-used (after decay) goes first; among equals, the least recently used.
+        victim = min(entries, key=lambda v: (self._score(entries[v], now), entries[v][1]))
+        del entries[victim]
+
+    # ------------------ Canonical forms ------------------
+    def resolve(self, field, value):
+        """The canonical form of `value` if it is a known variant, else `value` itself."""
+        if not value:
+            return value
+        return self._aliases.get(field, {}).get(field_key(field, value), value)
+
+    def clusters(self, field, score_cutoff=SIMILARITY_CUTOFF):
+        """[(canonical, [variants])] for `field`.
+
+        The most used spelling is the canonical one; between equally used ones
+        (e.g. freshly migrated values), the one with the longest key, which is
+        usually the complete spelling, then the one with least stray punctuation.
+        """
+        now = time.time()
+        entries = self._fields.get(field, {})
+        found = []
+        key = lambda v: field_key(field, v)
+        for group in cluster_values(self.ranked(field, now=now), score_cutoff, key):
+            canonical = max(group, key=lambda v: (round(self._score(entries[v], now), 6), len(value_key(v)), -len(v)))
+            found.append((canonical, [v for v in group if v != canonical]))
+        return found
+
+    def merge(self, field, canonical, variants):
+        """Fold the usage of `variants` into `canonical` and alias them to it."""
+        entries = self._fields.setdefault(field, {})
+        target = entries.setdefault(canonical, [0, 0, 0.0])
+        aliases = self._aliases.setdefault(field, {})
+        for variant in variants:
+            entry = entries.pop(variant, None)
+            if entry is not None and variant != canonical:
+                self._add_usage(target, entry)
+            aliases[field_key(field, variant)] = canonical
+        # a variant merged earlier may itself be the canonical form now
+        for key, value in aliases.items():
+            if value in variants:
+                aliases[key] = canonical
+        aliases[field_key(field, canonical)] = canonical
+
+    def canonicalize(self, score_cutoff=SIMILARITY_CUTOFF):
+        """Merge every cluster in every field. Returns {field: [(canonical, [variants])]}."""
+        merged = {}
+        for field in list(self._fields):
+            found = self.clusters(field, score_cutoff)
+            for canonical, variants in found:
+                self.merge(field, canonical, variants)
+            if found:
+                merged[field] = found
+        return merged
+
+    def ranked(self, field, limit=None, now=None):
+        """Values of `field`, most useful first."""
+        now = time.time() if now is None else now
+        entries = self._fields.get(field, {})
+        # sorted() is stable, so migrated values with equal usage keep their old order.
+        values = sorted(entries, key=lambda v: -self._score(entries[v], now))
+        return values[:limit] if limit else values
+
+
+class AutocompleteSaver:
+    """Background persistence for an AutocompleteStore (see the module docstring)."""
+
+    def __init__(self, store, path, wal, delay=1.0, checkpoint_entries=200):
+        self.store = store
+        self.path = path
+        self.backup_path = path.replace(".json", "_backup.json")
+        self.wal = wal
+        self.delay = delay
+        self.checkpoint_entries = checkpoint_entries
+        self._pending = []
+        # True while autocomplete.json is behind the store
+        self._dirty = False
+        self._save_requested = False
+        self._closing = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="autocomplete-saver", daemon=True)
+        self._thread.start()
+
+    def record(self, values, when=None):
+        """Count a use of each (field, value) pair now; persisted shortly after."""
+        when = time.time() if when is None else when
+        values = [(field, value) for field, value in values if value]
+        if not values:
+            return
+        with self._cond:
+            for field, value in values:
+                self.store.touch(field, value, when)
+                self._pending.append({"op": AUTOCOMPLETE, "field": field, "value": value, "ts": when})
+            self._dirty = True
+            self._cond.notify()
+
+    def request_save(self):
+        """Rewrite autocomplete.json soon, e.g. after replaying the log on startup."""
+        with self._cond:
+            self._dirty = self._save_requested = True
+            self._cond.notify()
+
+    def close(self, timeout=5.0):
+        """Write everything pending, checkpoint autocomplete.json and stop the thread."""
+        with self._cond:
+            self._closing = True
+            self._cond.notify()
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not (self._pending or self._save_requested or self._closing):
+                    self._cond.wait()
+                # debounce: let a burst of prints collect into one write
+                deadline = time.monotonic() + self.delay
+                while not self._closing and time.monotonic() < deadline:
+                    self._cond.wait(deadline - time.monotonic())
+                entries, self._pending = self._pending, []
+                closing = self._closing
+            try:
+                self.wal.append_many(entries)
+            except OSError as e:
+                logging.error(f"Failed to log {len(entries)} autocomplete uses: {e}")
+            if closing or self._save_requested or len(self.wal) >= self.checkpoint_entries:
+                self.save()
+            if closing:
+                return
+
+    def save(self):
+        """Checkpoint autocomplete.json if it is behind the store and drop the log entries it now holds."""
+        with self._cond:
+            self._save_requested = False
+            if not self._dirty:
+                return
+            data = self.store.to_json()
+            self._dirty = False
+        try:
+            tmp_file = self.path + ".tmp"
+            with open(tmp_file, "w") as f:
+                json.dump(data, f)
+                f.flush()
+                os.fsync(f.fileno())
+            if os.path.exists(self.path):
+                os.replace(self.path, self.backup_path)
+            os.replace(tmp_file, self.path)
+            # Uses still pending are not in the log yet, so only covered entries are dropped.
+            self.wal.checkpoint(AUTOCOMPLETE)
+            logging.info("Autocomplete saved successfully.")
+        except Exception as e:
+            with self._cond:
+                self._dirty = True
+            logging.error(f"Failed to save autocomplete.json: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find and merge spelling variants in autocomplete.json.")
+    parser.add_argument("path", nargs="?", default=os.path.join("records", "autocomplete.json"))
+    parser.add_argument("--cutoff", type=float, default=SIMILARITY_CUTOFF,
+                        help=f"similarity (0-100) for two values to be variants (default {SIMILARITY_CUTOFF})")
+    parser.add_argument("--apply", action="store_true", help="merge the variants (close the app first)")
+    args = parser.parse_args()
+
+    with open(args.path, "r", encoding="utf-8") as f:
+        store = AutocompleteStore.from_json(json.load(f), now=os.path.getmtime(args.path))
+    found = store.canonicalize(args.cutoff) if args.apply else {
+        field: store.clusters(field, args.cutoff) for field in list(store._fields)}
+    for field, clusters in found.items():
+        for canonical, variants in clusters:
+            print(f"{field}: {canonical!r} <- {', '.join(map(repr, variants))}")
+    if not any(found.values()):
+        print("No variants found.")
+    elif args.apply:
+        tmp = args.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(store.to_json(), f)
+        os.replace(tmp, args.path)
+        print(f"Merged; {args.path} updated.")
+
+
+if __name__ == "__main__":
+    main()
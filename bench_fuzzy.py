@@ -0,0 +1,81 @@
+"""
+Benchmark: per-query rapidfuzz extraction vs. the persistent FuzzyMatcher.
+
+Compares the old Fuzzy-mode code path (rebuild both name lists with
+astype(str).tolist() and run two process.extract calls per query) with
+remedy_search.FuzzyMatcher (choices prepared once, one process.cdist call
+over both columns with workers=-1).
+
+Usage: python bench_fuzzy.py [remedies.xlsx] [--rows N] [--repeat R]
+"""
+
+import argparse
+import time
+
+import pandas as pd
+from rapidfuzz import fuzz, process
+
+from remedy_search import FuzzyMatcher
+
+QUERIES = ["beledona", "arnica mont", "nux vom", "pulsatila", "sulphur", "calc carb", "rhus tox", "bryonia"]
+
+
+def load_names(path, rows):
+    df = pd.read_excel(path, engine="openpyxl")
+    df = df[["common_col", "latin_col"]].dropna(how="any").astype(str)
+    base = df.reset_index(drop=True)
+    # Grow the catalog to the requested size with suffixed copies.
+    parts, i = [], 0
+    while sum(len(p) for p in parts) < rows:
+        suffix = "" if i == 0 else f" {i}"
+        parts.append(base.assign(common_col=base.common_col + suffix, latin_col=base.latin_col + suffix))
+        i += 1
+    return pd.concat(parts, ignore_index=True).head(rows)
+
+
+def old_fuzzy(df, query):
+    hits, seen = [], set()
+    names_common = df["common_col"].astype(str).tolist()
+    for _, score, idx in process.extract(query, names_common, scorer=fuzz.WRatio, limit=50):
+        if score >= 60 and idx not in seen:
+            seen.add(idx)
+            hits.append(idx)
+    names_latin = df["latin_col"].astype(str).tolist()
+    for _, score, idx in process.extract(query, names_latin, scorer=fuzz.WRatio, limit=50):
+        if score >= 60 and idx not in seen:
+            seen.add(idx)
+            hits.append(idx)
+    return hits
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for q in QUERIES:
+            fn(q)
+    return (time.perf_counter() - start) / (repeat * len(QUERIES)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("xlsx", nargs="?", default="remedies.xlsx")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    df = load_names(args.xlsx, args.rows)
+    start = time.perf_counter()
+    matcher = FuzzyMatcher([df["common_col"].tolist(), df["latin_col"].tolist()])
+    build_ms = (time.perf_counter() - start) * 1000
+
+    old_ms = timed(lambda q: old_fuzzy(df, q), args.repeat)
+    new_ms = timed(matcher.search, args.repeat)
+    print(f"catalog rows:          {len(df)}")
+    print(f"FuzzyMatcher build:    {build_ms:8.1f} ms (once per load)")
+    print(f"old per-query extract: {old_ms:8.1f} ms/query")
+    print(f"FuzzyMatcher.search:   {new_ms:8.1f} ms/query")
+    print(f"speedup:               {old_ms / new_ms:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
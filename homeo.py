@@ -6,11 +6,21 @@ from PyQt5 import QtWidgets, QtCore
 # Optional libraries
 try:
     import pandas as pd
-    from rapidfuzz import process
     PANDAS_AVAILABLE = True
 except ImportError:
     PANDAS_AVAILABLE = False
 
+from remedy_model import RemedyResultModel
+from remedy_search import CONTAINS, FUZZY, STARTS_WITH, WORD_PREFIX, SearchEngine
+from remedy_worker import SearchDispatcher
+
+SEARCH_MODES = {
+    "Contains": CONTAINS,
+    "Starts with": STARTS_WITH,
+    "Word prefix": WORD_PREFIX,
+    "Fuzzy": FUZZY,
+}
+
 
 class HomeoWindow(QtWidgets.QWidget):
     def __init__(self):
@@ -19,6 +29,7 @@ class HomeoWindow(QtWidgets.QWidget):
         self.resize(900, 600)
 
         self.df = None
+        self.engine = None
         self.excel_file = 'remedies.xlsx'
         self._setup_ui()
         self._load_settings()
@@ -54,9 +65,9 @@ class HomeoWindow(QtWidgets.QWidget):
         layout.addLayout(opts)
 
         # Table
-        self.table = QtWidgets.QTableWidget()
-        self.table.setColumnCount(2)
-        self.table.setHorizontalHeaderLabels(["Common Name", "Latin Name"])
+        self.results_model = RemedyResultModel(("Common Name", "Latin Name"), self)
+        self.table = QtWidgets.QTableView()
+        self.table.setModel(self.results_model)
         self.table.horizontalHeader().setStretchLastSection(True)
         layout.addWidget(self.table)
 
@@ -64,6 +75,11 @@ class HomeoWindow(QtWidgets.QWidget):
         self.status = QtWidgets.QLabel("Ready")
         layout.addWidget(self.status)
 
+        # Searches run on a worker thread; only the newest result is shown
+        self._search = SearchDispatcher(self)
+        self._search.results_ready.connect(self._on_search_results)
+        self._search.search_failed.connect(lambda msg: self.status.setText(f"Search failed: {msg}"))
+
         # Button actions
         self.search_btn.clicked.connect(self.on_search)
         self.load_btn.clicked.connect(self._load_df)
@@ -113,18 +129,25 @@ class HomeoWindow(QtWidgets.QWidget):
             self.status.setText("Excel file missing.")
             return
         try:
+            self._search.cancel()
             self.df = pd.read_excel(self.excel_file_path, engine="openpyxl")
             self.df.fillna('', inplace=True)
+            names = (self._column_names("common_col"), self._column_names("latin_col"))
+            self.engine = SearchEngine(*names)
+            self.results_model.set_catalog(*names)
             self._populate_table(self.df)
             self.status.setText(f"Loaded {len(self.df)} entries.")
         except Exception as e:
             self.status.setText(f"Failed to load Excel: {e}")
 
+    def _column_names(self, col):
+        if col not in self.df.columns:
+            return [""] * len(self.df)
+        return self.df[col].astype(str).tolist()
+
     def _populate_table(self, df):
-        self.table.setRowCount(len(df))
-        for i, (_, row) in enumerate(df.iterrows()):
-            self.table.setItem(i, 0, QtWidgets.QTableWidgetItem(str(row.get("common_col", ""))))
-            self.table.setItem(i, 1, QtWidgets.QTableWidgetItem(str(row.get("latin_col", ""))))
+        # df is always self.df; the model only needs row positions
+        self.results_model.set_results(range(len(df)))
 
     # ---------------------- SEARCH ----------------------
     def on_query_changed(self):
@@ -138,29 +161,18 @@ class HomeoWindow(QtWidgets.QWidget):
 
         q = self.query.text().strip().lower()
         if not q:
+            self._search.cancel()
             self._populate_table(self.df)
             return
 
-        mode = self.mode.currentText()
-        if mode == "Contains":
-            f = self.df[self.df.apply(lambda r: q in str(r.common_col).lower() or q in str(r.latin_col).lower(), axis=1)]
-        elif mode == "Starts with":
-            f = self.df[self.df.apply(lambda r: str(r.common_col).lower().startswith(q) or str(r.latin_col).lower().startswith(q), axis=1)]
-        elif mode == "Word prefix":
-            f = self.df[self.df.apply(lambda r: any(w.startswith(q) for w in str(r.common_col).lower().split()) or any(w.startswith(q) for w in str(r.latin_col).lower().split()), axis=1)]
-        elif mode == "Fuzzy":
-            f = self._fuzzy_search(q)
-        else:
-            f = self.df
-
-        self._populate_table(f)
-        self.status.setText(f"Found {len(f)} results for '{q}'")
+        mode = SEARCH_MODES.get(self.mode.currentText(), CONTAINS)
+        engine = self.engine
+        self._search.submit(lambda: (q, engine.search(q, mode)))
 
-    def _fuzzy_search(self, q):
-        names = list(self.df.common_col) + list(self.df.latin_col)
-        matches = process.extract(q, names, limit=20)
-        found = set([m[0] for m in matches if m[1] > 50])
-        return self.df[self.df.apply(lambda r: r.common_col in found or r.latin_col in found, axis=1)]
+    def _on_search_results(self, result):
+        q, ids = result
+        self.results_model.set_results(ids)
+        self.status.setText(f"Found {len(ids)} results for '{q}'")
 
     # ---------------------- ADD NEW ----------------------
     def on_add_new(self):
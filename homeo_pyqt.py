@@ -1,6 +1,5 @@
 import sys
 import os
-import unicodedata
 import re
 import json
 from PyQt5 import QtWidgets, QtGui, QtCore
@@ -11,7 +10,17 @@ try:
 except Exception:
     PANDAS_AVAILABLE = False
 
-from rapidfuzz import process, fuzz
+from remedy_model import RemedyResultModel
+from remedy_search import CONTAINS, FUZZY, STARTS_WITH, TYPO, WORD_PREFIX, SearchEngine
+from remedy_worker import SearchDispatcher
+
+SEARCH_MODES = {
+    'Contains (Excel)': CONTAINS,
+    'Starts-with': STARTS_WITH,
+    'Word-prefix': WORD_PREFIX,
+    'Fuzzy': FUZZY,
+    'Typo-tolerant': TYPO,
+}
 
 class HomeoWindow(QtWidgets.QWidget):
     def __init__(self):
@@ -19,6 +28,7 @@ class HomeoWindow(QtWidgets.QWidget):
         self.setWindowTitle('Homeopathy Name Search (PyQt)')
         self.resize(700, 500)
         self.df = None
+        self._engine = None
         self.latin_col = 'latin_col'
         self.common_col = 'common_col'
         # settings persistence
@@ -52,8 +62,8 @@ class HomeoWindow(QtWidgets.QWidget):
         control_row = QtWidgets.QHBoxLayout()
         control_row.addStretch()
         self.mode_combo = QtWidgets.QComboBox()
-        # Excel-like contains (default), Starts-with (full name), Word-prefix, Fuzzy
-        self.mode_combo.addItems(['Contains (Excel)', 'Starts-with', 'Word-prefix', 'Fuzzy'])
+        # Excel-like contains (default), Starts-with (full name), Word-prefix, Fuzzy, Typo-tolerant
+        self.mode_combo.addItems(['Contains (Excel)', 'Starts-with', 'Word-prefix', 'Fuzzy', 'Typo-tolerant'])
         control_row.addWidget(QtWidgets.QLabel('Mode:'))
         control_row.addWidget(self.mode_combo)
         self.incremental_chk = QtWidgets.QCheckBox('Incremental')
@@ -72,8 +82,9 @@ class HomeoWindow(QtWidgets.QWidget):
         self.status = QtWidgets.QLabel('Ready. Load remedies.xlsx')
         layout.addWidget(self.status)
 
-        self.table = QtWidgets.QTableWidget(0, 2)
-        self.table.setHorizontalHeaderLabels(['Common', 'Latin'])
+        self.results_model = RemedyResultModel(('Common', 'Latin'), self)
+        self.table = QtWidgets.QTableView()
+        self.table.setModel(self.results_model)
         self.table.horizontalHeader().setStretchLastSection(True)
         self.table.verticalHeader().setVisible(False)
         self.table.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
@@ -84,6 +95,11 @@ class HomeoWindow(QtWidgets.QWidget):
         self.ai_btn.clicked.connect(self.on_ai_suggest)
         self.load_btn.clicked.connect(self.load_excel)
         self.query.returnPressed.connect(self.on_search)
+        # searches run off the GUI thread; stale results are dropped
+        self._search_dispatcher = SearchDispatcher(self)
+        self._search_dispatcher.results_ready.connect(self._on_search_results)
+        self._search_dispatcher.search_failed.connect(lambda msg: self.status.setText(f'Search failed: {msg}'))
+
         # debounce timer for incremental search
         self._debounce_timer = QtCore.QTimer(self)
         self._debounce_timer.setSingleShot(True)
@@ -97,7 +113,7 @@ class HomeoWindow(QtWidgets.QWidget):
 
         # save settings when mode or incremental changes
         def _save_settings(*_args):
-            s = {'mode': self.mode_combo.currentText(), 'incremental': bool(self.incremental_chk.isChecked())}
+            s = dict(self._settings, mode=self.mode_combo.currentText(), incremental=bool(self.incremental_chk.isChecked()))
             try:
                 with open(self._settings_path, 'w', encoding='utf-8') as sf:
                     json.dump(s, sf)
@@ -125,30 +141,17 @@ class HomeoWindow(QtWidgets.QWidget):
         df.rename(columns={c: c.lower().strip() for c in df.columns}, inplace=True)
         self.df = df[['latin_col', 'common_col']].dropna(how='any')
 
-        # Precompute normalized/cleaned columns for reliable matching
-        def _clean(s):
-            if s is None:
-                return ''
-            s = str(s)
-            # Normalize unicode (NFC)
-            s = unicodedata.normalize('NFC', s)
-            # Remove common invisible/formatting characters that break matching
-            s = s.replace('\u200c', '').replace('\u200d', '')  # ZWNJ, ZWJ
-            s = s.replace('\u00a0', ' ')  # NBSP to space
-            # Strip and collapse whitespace
-            s = re.sub(r'\s+', ' ', s).strip()
-            return s
-        self.df['common_norm'] = self.df['common_col'].astype(str).apply(_clean)
-        # also create a latin_norm for starts-with matching in Latin text
-        def _clean_latin(s):
-            if s is None:
-                return ''
-            s = _clean(s)
-            return s.casefold()
+        # the engine owns name normalization, the indexes and their caches
+        self._search_dispatcher.cancel()
+        display_columns = [self.df[self.common_col].astype(str).tolist(), self.df[self.latin_col].astype(str).tolist()]
+        self.results_model.set_catalog(*display_columns)
+        self._engine = SearchEngine(*display_columns,
+                                    fuzzy_cutoff=self._settings.get('fuzzy_cutoff', 60),
+                                    fuzzy_limit=self._settings.get('fuzzy_limit', 50))
 
-        self.df['latin_norm'] = self.df['latin_col'].astype(str).apply(_clean_latin)
-        # normalize common_norm for casefold (helps Latin letters inside common)
-        self.df['common_norm_cf'] = self.df['common_norm'].astype(str).apply(lambda x: unicodedata.normalize('NFC', x).casefold())
+    def _selected_names(self):
+        rows = self.table.selectionModel().selectedRows()
+        return self.results_model.names(rows[0].row()) if rows else None
 
     def load_excel(self):
         if not PANDAS_AVAILABLE:
@@ -174,11 +177,10 @@ class HomeoWindow(QtWidgets.QWidget):
         from bs4 import BeautifulSoup
         # Try to get latin name from selected row
         latin_name = None
-        sel = self.table.selectedItems()
+        sel = self._selected_names()
         if sel:
-            # table has two columns, common and latin
-            if len(sel) >= 2:
-                latin_name = sel[1].text().strip()
+            # (common, latin) of the selected row
+            latin_name = sel[1].strip()
         if not latin_name:
             latin_name = self.query.text().strip()
         if not latin_name:
@@ -242,9 +244,9 @@ class HomeoWindow(QtWidgets.QWidget):
         q = self.query.text().strip()
         if not q:
             # if no query, try to suggest based on current selection
-            sel = self.table.selectedItems()
-            if sel and len(sel) >= 1:
-                q = sel[0].text().strip()
+            sel = self._selected_names()
+            if sel:
+                q = sel[0].strip()
         if not q:
             self.status.setText('Type or select a remedy to get AI suggestions.')
             return
@@ -290,16 +292,11 @@ class HomeoWindow(QtWidgets.QWidget):
 
         # Local fallback: use rapidfuzz to suggest close matches from common and latin columns
         try:
-            names_common = self.df[self.common_col].astype(str).tolist() if self.df is not None else []
-            names_latin = self.df[self.latin_col].astype(str).tolist() if self.df is not None else []
-            combined = list(dict.fromkeys(names_common + names_latin))
-            if not combined:
+            if self._engine is None or not len(self._engine):
                 self.status.setText('No local data available for suggestions.')
                 return
-            found = process.extract(q, combined, scorer=fuzz.WRatio, limit=10)
-            bullets = []
-            for name, score, idx in found:
-                bullets.append(f"- {name}  ({score}%)")
+            found = self._engine.best_names(q, limit=10)
+            bullets = [f"- {name}  ({score:.0f}%)" for name, score in found]
             text = "Local suggestions:\n\n" + "\n".join(bullets)
             dlg = QtWidgets.QDialog(self)
             dlg.setWindowTitle('AI Suggestions (Local)')
@@ -320,8 +317,9 @@ class HomeoWindow(QtWidgets.QWidget):
 
     def on_search(self):
         query = self.query.text().strip()
-        self.table.setRowCount(0)
         if not query:
+            self._search_dispatcher.cancel()
+            self.results_model.clear()
             self.status.setText('Type a remedy name.')
             return
         if self.df is None:
@@ -329,77 +327,16 @@ class HomeoWindow(QtWidgets.QWidget):
             return
 
         mode = self.mode_combo.currentText()
-        count = 0
-        seen = set()
-
-        def add_row(idx):
-            nonlocal count
-            if idx in seen:
-                return
-            seen.add(idx)
-            common = str(self.df.iloc[idx][self.common_col])
-            latin = str(self.df.iloc[idx][self.latin_col])
-            row = self.table.rowCount()
-            self.table.insertRow(row)
-            item_common = QtWidgets.QTableWidgetItem(common)
-            item_latin = QtWidgets.QTableWidgetItem(latin)
-            self.table.setItem(row, 0, item_common)
-            self.table.setItem(row, 1, item_latin)
-            count += 1
-
-        # Fuzzy: run on both common and latin columns and merge results
-        if mode == 'Fuzzy':
-            names_common = self.df[self.common_col].astype(str).tolist()
-            found_c = process.extract(query, names_common, scorer=fuzz.WRatio, limit=50)
-            for name, score, idx in found_c:
-                if score >= 60:
-                    add_row(idx)
-            names_latin = self.df[self.latin_col].astype(str).tolist()
-            found_l = process.extract(query, names_latin, scorer=fuzz.WRatio, limit=50)
-            for name, score, idx in found_l:
-                if score >= 60:
-                    add_row(idx)
-        else:
-            # prepare normalized columns
-            common_list = self.df['common_norm_cf'].astype(str).tolist()
-            latin_list = self.df['latin_norm'].astype(str).tolist()
-            q_norm = unicodedata.normalize('NFC', query).strip()
-            tokens = [t for t in q_norm.split() if t]
-            tokens_cf = [unicodedata.normalize('NFC', t).casefold() for t in tokens]
-
-            if mode == 'Contains (Excel)':
-                # require each token to appear in either common OR latin (all tokens must be found somewhere)
-                for idx, (c, l) in enumerate(zip(common_list, latin_list)):
-                    ok = True
-                    for t in tokens_cf:
-                        if (t not in c) and (t not in l):
-                            ok = False
-                            break
-                    if ok:
-                        add_row(idx)
-
-            elif mode == 'Starts-with':
-                q_cf = q_norm.casefold()
-                for idx, (c, l) in enumerate(zip(common_list, latin_list)):
-                    if c.startswith(q_cf) or l.startswith(q_cf):
-                        add_row(idx)
+        self._search_dispatcher.submit(lambda: (mode, self._find(query, mode)))
 
-            elif mode == 'Word-prefix':
-                first = tokens_cf[0] if tokens_cf else ''
-                for idx, (c, l) in enumerate(zip(common_list, latin_list)):
-                    matched = False
-                    for w in c.split():
-                        if w.startswith(first):
-                            matched = True
-                            break
-                    if not matched:
-                        for w in l.split():
-                            if w.startswith(first):
-                                matched = True
-                                break
-                    if matched:
-                        add_row(idx)
+    def _find(self, query, mode):
+        """Row positions matching the query; runs on the search worker thread."""
+        return self._engine.search(query, SEARCH_MODES[mode])
 
+    def _on_search_results(self, result):
+        mode, hits = result
+        self.results_model.set_results(hits)
+        count = len(hits)
         if count:
             self.status.setText(f'Found {count} results ({mode}).')
         else:
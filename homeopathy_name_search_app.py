@@ -33,6 +33,9 @@ try:
 except Exception:
     PANDAS_AVAILABLE = False
 
+from remedy_catalog import normalize_name
+from remedy_search import CONTAINS, TYPO, SearchEngine, query_tokens
+
 KV = '''
 <HomeBox>:
     orientation: 'vertical'
@@ -106,6 +109,7 @@ class HomeBox(BoxLayout):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.df = None
+        self.engine = None
         self.latin_col = 'Latin'   # change if your Excel has different headers
         self.common_col = 'Common' # change if your Excel has different headers
         self.m_lat_to_common = {}
@@ -154,6 +158,7 @@ class HomeBox(BoxLayout):
 
         self.df = df[[lc, cc]].copy()
         self.df.dropna(how='all', inplace=True)
+        self.engine = SearchEngine(self.df[cc].fillna(''), self.df[lc].fillna(''))
 
         # build lowercase lookup mappings
         self.m_lat_to_common = {}
@@ -216,48 +221,23 @@ class HomeBox(BoxLayout):
                     use_lat_to_common = None
 
             results = []
-            if use_lat_to_common is True:
-                # exact match
-                if ql in self.m_lat_to_common:
-                    results.append((query, self.m_lat_to_common[ql]))
-                else:
-                    # partial matches in latin column
-                    matches = self.df[self.df.iloc[:,0].str.lower().str.contains(ql, na=False)]
-                    for _, r in matches.iterrows():
-                        results.append((str(r.iloc[0]), str(r.iloc[1])))
-            elif use_lat_to_common is False:
-                if ql in self.m_common_to_lat:
-                    results.append((self.m_common_to_lat[ql], query))
-                else:
-                    matches = self.df[self.df.iloc[:,1].str.lower().str.contains(ql, na=False)]
-                    for _, r in matches.iterrows():
-                        results.append((str(r.iloc[0]), str(r.iloc[1])))
+            if use_lat_to_common is True and ql in self.m_lat_to_common:
+                results.append((query, self.m_lat_to_common[ql]))
+            elif use_lat_to_common is False and ql in self.m_common_to_lat:
+                results.append((self.m_common_to_lat[ql], query))
             else:
-                # search both columns for partial matches
-                matches_lat = self.df[self.df.iloc[:,0].str.lower().str.contains(ql, na=False)]
-                for _, r in matches_lat.iterrows():
-                    results.append((str(r.iloc[0]), str(r.iloc[1])))
-                matches_com = self.df[self.df.iloc[:,1].str.lower().str.contains(ql, na=False)]
-                for _, r in matches_com.iterrows():
-                    tup = (str(r.iloc[0]), str(r.iloc[1]))
-                    if tup not in results:
+                # partial matches in both columns, or only the one the direction names
+                column = {True: 0, False: 1}.get(use_lat_to_common)
+                tokens = query_tokens(ql)
+                for pos in self.engine.search(ql, CONTAINS):
+                    tup = (str(self.df.iloc[pos, 0]), str(self.df.iloc[pos, 1]))
+                    if column is None or all(t in normalize_name(tup[column]) for t in tokens):
                         results.append(tup)
 
             if not results:
-                # try fuzzy contains by splitting words
-                parts = ql.split()
-                for p in parts:
-                    if not p: continue
-                    matches = self.df[self.df.iloc[:,0].str.lower().str.contains(p, na=False)]
-                    for _, r in matches.iterrows():
-                        tup = (str(r.iloc[0]), str(r.iloc[1]))
-                        if tup not in results:
-                            results.append(tup)
-                    matches = self.df[self.df.iloc[:,1].str.lower().str.contains(p, na=False)]
-                    for _, r in matches.iterrows():
-                        tup = (str(r.iloc[0]), str(r.iloc[1]))
-                        if tup not in results:
-                            results.append(tup)
+                # nothing contains the query; try names within a typo or two
+                for pos in self.engine.search(ql, TYPO):
+                    results.append((str(self.df.iloc[pos, 0]), str(self.df.iloc[pos, 1])))
 
             # show results
             if results:
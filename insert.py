@@ -1,6 +1,5 @@
 import sys
 import os
-import unicodedata
 import re
 import json
 from PyQt5 import QtWidgets, QtGui, QtCore
@@ -11,8 +10,19 @@ try:
 except Exception:
     PANDAS_AVAILABLE = False
 
-from rapidfuzz import process, fuzz
+from remedy_model import RemedyResultModel
+from remedy_search import CONTAINS, FUZZY, STARTS_WITH, TYPO, WORD_PREFIX, SearchEngine
+from remedy_worker import SearchDispatcher
+from remedy_store import RemedyStore
 
+REMEDIES_DB = os.path.join('records', 'remedies.db')
+SEARCH_MODES = {
+    'Contains (Excel)': CONTAINS,
+    'Starts-with': STARTS_WITH,
+    'Word-prefix': WORD_PREFIX,
+    'Fuzzy': FUZZY,
+    'Typo-tolerant': TYPO,
+}
 
 class HomeoWindow(QtWidgets.QWidget):
     def __init__(self):
@@ -20,6 +30,10 @@ class HomeoWindow(QtWidgets.QWidget):
         self.setWindowTitle('Homeopathy Name Search (PyQt)')
         self.resize(800, 550)
         self.df = None
+        self.store = None
+        self._excel_path = 'remedies.xlsx'
+        self._engine = None
+        self._catalog = None
         self.latin_col = 'latin_col'
         self.common_col = 'common_col'
 
@@ -57,7 +71,7 @@ class HomeoWindow(QtWidgets.QWidget):
         control_row = QtWidgets.QHBoxLayout()
         control_row.addStretch()
         self.mode_combo = QtWidgets.QComboBox()
-        self.mode_combo.addItems(['Contains (Excel)', 'Starts-with', 'Word-prefix', 'Fuzzy'])
+        self.mode_combo.addItems(['Contains (Excel)', 'Starts-with', 'Word-prefix', 'Fuzzy', 'Typo-tolerant'])
         control_row.addWidget(QtWidgets.QLabel('Mode:'))
         control_row.addWidget(self.mode_combo)
         self.incremental_chk = QtWidgets.QCheckBox('Incremental')
@@ -77,8 +91,9 @@ class HomeoWindow(QtWidgets.QWidget):
         self.status = QtWidgets.QLabel('Ready. Load remedies.xlsx')
         layout.addWidget(self.status)
 
-        self.table = QtWidgets.QTableWidget(0, 2)
-        self.table.setHorizontalHeaderLabels(['Common', 'Latin'])
+        self.results_model = RemedyResultModel(('Common', 'Latin'), self)
+        self.table = QtWidgets.QTableView()
+        self.table.setModel(self.results_model)
         self.table.horizontalHeader().setStretchLastSection(True)
         self.table.verticalHeader().setVisible(False)
         self.table.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
@@ -92,6 +107,11 @@ class HomeoWindow(QtWidgets.QWidget):
         self.add_btn.clicked.connect(self.on_add_new)
         self.query.returnPressed.connect(self.on_search)
 
+        # --- Background search: newest query wins ---
+        self._search_dispatcher = SearchDispatcher(self)
+        self._search_dispatcher.results_ready.connect(self._on_search_results)
+        self._search_dispatcher.search_failed.connect(lambda msg: self.status.setText(f'Search failed: {msg}'))
+
         # --- Debounce for incremental search ---
         self._debounce_timer = QtCore.QTimer(self)
         self._debounce_timer.setSingleShot(True)
@@ -105,7 +125,7 @@ class HomeoWindow(QtWidgets.QWidget):
 
         # --- Save settings when changed ---
         def _save_settings(*_args):
-            s = {'mode': self.mode_combo.currentText(), 'incremental': bool(self.incremental_chk.isChecked())}
+            s = dict(self._settings, mode=self.mode_combo.currentText(), incremental=bool(self.incremental_chk.isChecked()))
             try:
                 with open(self._settings_path, 'w', encoding='utf-8') as sf:
                     json.dump(s, sf)
@@ -132,23 +152,36 @@ class HomeoWindow(QtWidgets.QWidget):
     def _load_df(self, path):
         if not PANDAS_AVAILABLE:
             raise RuntimeError('pandas not available')
-        df = pd.read_excel(path, engine='openpyxl')
-        df.rename(columns={c: c.lower().strip() for c in df.columns}, inplace=True)
-        self.df = df[['latin_col', 'common_col']].dropna(how='any')
-
-        def _clean(s):
-            if s is None:
-                return ''
-            s = str(s)
-            s = unicodedata.normalize('NFC', s)
-            s = s.replace('\u200c', '').replace('\u200d', '')
-            s = s.replace('\u00a0', ' ')
-            s = re.sub(r'\s+', ' ', s).strip()
-            return s
-
-        self.df['common_norm'] = self.df['common_col'].astype(str).apply(_clean)
-        self.df['latin_norm'] = self.df['latin_col'].astype(str).apply(lambda x: _clean(x).casefold())
-        self.df['common_norm_cf'] = self.df['common_norm'].astype(str).apply(lambda x: unicodedata.normalize('NFC', x).casefold())
+        if self.store is None:
+            os.makedirs(os.path.dirname(REMEDIES_DB), exist_ok=True)
+            self.store = RemedyStore(REMEDIES_DB)
+        self.store.sync_from_excel(path)
+        self._excel_path = path
+        self._refresh_df()
+
+    def _refresh_df(self):
+        df = pd.DataFrame(self.store.rows(), columns=['id', 'common_col', 'latin_col'])
+        self.df = df[(df['common_col'] != '') & (df['latin_col'] != '')].reset_index(drop=True)
+
+        # the engine owns name normalization, the indexes and their caches
+        self._search_dispatcher.cancel()
+        self._catalog = [self.df[self.common_col].astype(str).tolist(), self.df[self.latin_col].astype(str).tolist()]
+        self.results_model.set_catalog(*self._catalog)
+        self._engine = SearchEngine(*self._catalog,
+                                    fuzzy_cutoff=self._settings.get('fuzzy_cutoff', 60),
+                                    fuzzy_limit=self._settings.get('fuzzy_limit', 50))
+
+    def _append_row(self, rid, common, latin):
+        # The engine appends at position len(self.df), matching the new row here and in the
+        # model's catalog lists, so a new remedy costs one insert instead of a full reindex.
+        self.df.loc[len(self.df)] = [rid, common, latin]
+        self._catalog[0].append(common)
+        self._catalog[1].append(latin)
+        self._engine.add(common, latin)
+
+    def _selected_names(self):
+        rows = self.table.selectionModel().selectedRows()
+        return self.results_model.names(rows[0].row()) if rows else None
 
     def load_excel(self):
         if not PANDAS_AVAILABLE:
@@ -209,17 +242,28 @@ class HomeoWindow(QtWidgets.QWidget):
                 return
 
             try:
-                df = pd.read_excel(path, engine='openpyxl')
-                new_row = {'common_col': common_name, 'latin_col': latin_name}
-                df = pd.concat([df, pd.DataFrame([new_row])], ignore_index=True)
-                df.to_excel(path, index=False, engine='openpyxl')
-                self._load_df(path)
+                if self.store is None:
+                    self._load_df(path)
+                rid = self.store.add(common_name, latin_name)
+                if rid is None:
+                    QtWidgets.QMessageBox.warning(self, 'Already Exists', 'A remedy with this Common or Latin name already exists.')
+                    return
+                self._append_row(rid, common_name, latin_name)
                 self.status.setText(f'Added: {common_name} - {latin_name}')
                 QtWidgets.QMessageBox.information(self, 'Success', 'New remedy added successfully!')
                 self.on_search()
             except Exception as e:
                 QtWidgets.QMessageBox.critical(self, 'Error', f'Failed to add new entry:\n{e}')
 
+    def closeEvent(self, event):
+        # New remedies are written back to remedies.xlsx in one bulk export on exit.
+        if self.store is not None and self.store.dirty:
+            try:
+                self.store.export_to_excel(self._excel_path)
+            except Exception as e:
+                QtWidgets.QMessageBox.warning(self, 'Export Failed', f'Could not update remedies.xlsx:\n{e}')
+        event.accept()
+
     # ============================================================
     # Materia Medica
     # ============================================================
@@ -227,9 +271,9 @@ class HomeoWindow(QtWidgets.QWidget):
         import requests
         from bs4 import BeautifulSoup
         latin_name = None
-        sel = self.table.selectedItems()
-        if sel and len(sel) >= 2:
-            latin_name = sel[1].text().strip()
+        sel = self._selected_names()
+        if sel:
+            latin_name = sel[1].strip()
         if not latin_name:
             latin_name = self.query.text().strip()
         if not latin_name:
@@ -281,9 +325,9 @@ class HomeoWindow(QtWidgets.QWidget):
     def on_ai_suggest(self):
         q = self.query.text().strip()
         if not q:
-            sel = self.table.selectedItems()
-            if sel and len(sel) >= 1:
-                q = sel[0].text().strip()
+            sel = self._selected_names()
+            if sel:
+                q = sel[0].strip()
         if not q:
             self.status.setText('Type or select a remedy to get AI suggestions.')
             return
@@ -325,14 +369,11 @@ class HomeoWindow(QtWidgets.QWidget):
                 self.status.setText(f'OpenAI request failed, falling back: {e}')
 
         try:
-            names_common = self.df[self.common_col].astype(str).tolist() if self.df is not None else []
-            names_latin = self.df[self.latin_col].astype(str).tolist() if self.df is not None else []
-            combined = list(dict.fromkeys(names_common + names_latin))
-            if not combined:
+            if self._engine is None or not len(self._engine):
                 self.status.setText('No local data available for suggestions.')
                 return
-            found = process.extract(q, combined, scorer=fuzz.WRatio, limit=10)
-            bullets = [f"- {name}  ({score}%)" for name, score, _ in found]
+            found = self._engine.best_names(q, limit=10)
+            bullets = [f"- {name}  ({score:.0f}%)" for name, score in found]
             text = "Local suggestions:\n\n" + "\n".join(bullets)
             dlg = QtWidgets.QDialog(self)
             dlg.setWindowTitle('AI Suggestions (Local)')
@@ -355,8 +396,9 @@ class HomeoWindow(QtWidgets.QWidget):
     # ============================================================
     def on_search(self):
         query = self.query.text().strip()
-        self.table.setRowCount(0)
         if not query:
+            self._search_dispatcher.cancel()
+            self.results_model.clear()
             self.status.setText('Type a remedy name.')
             return
         if self.df is None:
@@ -364,56 +406,16 @@ class HomeoWindow(QtWidgets.QWidget):
             return
 
         mode = self.mode_combo.currentText()
-        count = 0
-        seen = set()
+        self._search_dispatcher.submit(lambda: (mode, self._find(query, mode)))
 
-        def add_row(idx):
-            nonlocal count
-            if idx in seen:
-                return
-            seen.add(idx)
-            common = str(self.df.iloc[idx][self.common_col])
-            latin = str(self.df.iloc[idx][self.latin_col])
-            row = self.table.rowCount()
-            self.table.insertRow(row)
-            self.table.setItem(row, 0, QtWidgets.QTableWidgetItem(common))
-            self.table.setItem(row, 1, QtWidgets.QTableWidgetItem(latin))
-            count += 1
-
-        if mode == 'Fuzzy':
-            names_common = self.df[self.common_col].astype(str).tolist()
-            found_c = process.extract(query, names_common, scorer=fuzz.WRatio, limit=50)
-            for name, score, idx in found_c:
-                if score >= 60:
-                    add_row(idx)
-            names_latin = self.df[self.latin_col].astype(str).tolist()
-            found_l = process.extract(query, names_latin, scorer=fuzz.WRatio, limit=50)
-            for name, score, idx in found_l:
-                if score >= 60:
-                    add_row(idx)
-        else:
-            common_list = self.df['common_norm_cf'].astype(str).tolist()
-            latin_list = self.df['latin_norm'].astype(str).tolist()
-            q_norm = unicodedata.normalize('NFC', query).strip()
-            tokens = [t for t in q_norm.split() if t]
-            tokens_cf = [unicodedata.normalize('NFC', t).casefold() for t in tokens]
-
-            if mode == 'Contains (Excel)':
-                for idx, (c, l) in enumerate(zip(common_list, latin_list)):
-                    if all((t in c) or (t in l) for t in tokens_cf):
-                        add_row(idx)
-            elif mode == 'Starts-with':
-                q_cf = q_norm.casefold()
-                for idx, (c, l) in enumerate(zip(common_list, latin_list)):
-                    if c.startswith(q_cf) or l.startswith(q_cf):
-                        add_row(idx)
-            elif mode == 'Word-prefix':
-                first = tokens_cf[0] if tokens_cf else ''
-                for idx, (c, l) in enumerate(zip(common_list, latin_list)):
-                    matched = any(w.startswith(first) for w in c.split()) or any(w.startswith(first) for w in l.split())
-                    if matched:
-                        add_row(idx)
+    def _find(self, query, mode):
+        """Row positions matching the query; runs on the search worker thread."""
+        return self._engine.search(query, SEARCH_MODES[mode])
 
+    def _on_search_results(self, result):
+        mode, hits = result
+        self.results_model.set_results(hits)
+        count = len(hits)
         self.status.setText(f'Found {count} results ({mode}).' if count else f'No matches found ({mode}).')
 
 
@@ -0,0 +1,177 @@
+"""
+Label layout shared by the PDF renderer and the on-screen preview.
+
+A `LabelLayout` is compiled once per (label size, font size, top offset):
+the border, the centre line, each row's baseline, font and largest size,
+and the width a row may use. `ops(record)` then lays out one label as a
+list of positioned `DrawOp`s (points, origin bottom-left as in reportlab):
+
+    row 0-1  medicine name, wrapped by measured width; row 1 ends with the potency
+    row 2    dose (bold) and time, centred together
+    row 3    shop
+    row 4    branch / phone
+
+A row that does not fit is shrunk by a binary search over font sizes down
+to MIN_FONT_SIZE. Text widths come from reportlab's font metrics at unit
+size through an LRU cache, so a label costs a few dict lookups per word
+after the first prints; widths scale linearly with the font size.
+
+`render_pdf` writes any number of labels into one PDF, a page per label,
+so a batch goes to the printer as a single job.
+"""
+
+import functools
+from collections import namedtuple
+
+from reportlab.lib.units import mm
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
+
+FONTS = {"bold": "Helvetica-Bold", "regular": "Helvetica"}
+MIN_FONT_SIZE = 5.0
+# Font sizes are searched in steps of this many points.
+SIZE_STEP = 0.25
+BORDER_INSET = 2 * mm
+# Space kept between the text and the border on either side.
+PADDING = 1 * mm
+# Points between dose and time.
+DOSE_TIME_GAP = 6
+
+# A piece of text to draw: `x` is its left edge and `y` its baseline.
+DrawOp = namedtuple("DrawOp", "row x y font size text")
+
+
+@functools.lru_cache(maxsize=8192)
+def unit_width(text, font):
+    """Width of `text` at 1 pt in `font`; multiply by the font size."""
+    return stringWidth(text, font, 1)
+
+
+def _line_width(words, font):
+    return sum(unit_width(w, font) for w in words) + unit_width(" ", font) * max(len(words) - 1, 0)
+
+
+def _fit_size(fits, largest):
+    """Largest size from MIN_FONT_SIZE to `largest` (in SIZE_STEP steps) for which `fits(size)` holds.
+
+    `fits` must only turn false as the size grows; MIN_FONT_SIZE is returned if nothing fits.
+    """
+    if fits(largest):
+        return largest
+    lo, hi = 0, int((largest - MIN_FONT_SIZE) / SIZE_STEP)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if fits(MIN_FONT_SIZE + mid * SIZE_STEP):
+            lo = mid
+        else:
+            hi = mid - 1
+    return MIN_FONT_SIZE + lo * SIZE_STEP
+
+
+def wrap_name(words, potency, font, size, max_width):
+    """Split a medicine name over two rows at `size`: (row 0 words, row 1 words); row 1 ends with `potency`.
+
+    Returns None when the words do not fit in two rows.
+    """
+    limit = max_width / size
+    space = unit_width(" ", font)
+    first, used = [], 0.0
+    for word in words:
+        width = unit_width(word, font)
+        if used + (space if first else 0) + width > limit:
+            break
+        used += (space if first else 0) + width
+        first.append(word)
+    second = words[len(first):] + ([potency] if potency else [])
+    if (words and not first) or _line_width(second, font) > limit:
+        return None
+    return first, second
+
+
+class LabelLayout:
+    def __init__(self, width_mm=50, height_mm=30, font_size=8, top_offset=6.0):
+        self.width = width_mm * mm
+        self.height = height_mm * mm
+        self.font_size = font_size
+        self.border = (BORDER_INSET, BORDER_INSET, self.width - 2 * BORDER_INSET, self.height - 2 * BORDER_INSET)
+        self.center = self.width / 2
+        self.max_width = self.width - 2 * (BORDER_INSET + PADDING)
+        top = self.height - top_offset * mm
+        # row -> (baseline, font, largest font size)
+        self.rows = [
+            (top, FONTS["bold"], font_size),
+            (top - 5 * mm, FONTS["bold"], font_size),
+            (top - 11 * mm, FONTS["bold"], 8),
+            (top - 16 * mm, FONTS["bold"], 7),
+            (top - 20 * mm, FONTS["bold"], 7),
+        ]
+
+    def _centred(self, row, font, size, text):
+        x = self.center - unit_width(text, font) * size / 2
+        return DrawOp(row, x, self.rows[row][0], font, size, text)
+
+    def ops(self, record):
+        """Draw ops for one label; `record` uses the journal keys ("Medicine", "Potency", ...)."""
+        found = []
+        words = str(record.get("Medicine") or "").upper().split()
+        potency = str(record.get("Potency") or "").upper()
+        _, font, largest = self.rows[0]
+        size = _fit_size(lambda s: wrap_name(words, potency, font, s, self.max_width) is not None, largest)
+        # Nothing fits even at the smallest size (one very long word): let it overflow rather than vanish.
+        first, second = wrap_name(words, potency, font, size, self.max_width) or (words, [potency] if potency else [])
+        for row, line in ((0, first), (1, second)):
+            if line:
+                found.append(self._centred(row, font, size, " ".join(line)))
+
+        dose = str(record.get("Dose") or "")
+        time_val = str(record.get("Time") or "")
+        y, bold, largest = self.rows[2]
+        regular = FONTS["regular"]
+        gap = DOSE_TIME_GAP if dose and time_val else 0
+        natural = unit_width(dose, bold) * largest + gap + unit_width(time_val, regular) * largest
+        size = _fit_size(lambda s: natural * s / largest <= self.max_width, largest)
+        x = self.center - natural * size / largest / 2
+        if dose:
+            found.append(DrawOp(2, x, y, bold, size, dose))
+        if time_val:
+            x += unit_width(dose, bold) * size + gap * size / largest
+            found.append(DrawOp(2, x, y, regular, size, time_val))
+
+        for row, key in ((3, "Shop"), (4, "Branch/Phone")):
+            text = str(record.get(key) or "").upper()
+            if not text:
+                continue
+            _, font, largest = self.rows[row]
+            size = _fit_size(lambda s: unit_width(text, font) * s <= self.max_width, largest)
+            found.append(self._centred(row, font, size, text))
+        return found
+
+    def row_texts(self, ops):
+        """The text of each row, for a preview that shows the label line by line."""
+        texts = [""] * len(self.rows)
+        for op in ops:
+            texts[op.row] = f"{texts[op.row]}   {op.text}" if texts[op.row] else op.text
+        return texts
+
+    def draw(self, c, ops):
+        """Draw one label on the current page of a reportlab canvas."""
+        c.setLineWidth(1)
+        c.rect(*self.border)
+        for op in ops:
+            c.setFont(op.font, op.size)
+            c.drawString(op.x, op.y, op.text)
+
+
+@functools.lru_cache(maxsize=16)
+def compile_layout(width_mm=50, height_mm=30, font_size=8, top_offset=6.0):
+    """The LabelLayout for these settings, compiled once and reused."""
+    return LabelLayout(width_mm, height_mm, font_size, top_offset)
+
+
+def render_pdf(pdf_file, layout, records):
+    """Write `records` as labels into `pdf_file`, one page each."""
+    c = canvas.Canvas(pdf_file, pagesize=(layout.width, layout.height))
+    for record in records:
+        layout.draw(c, layout.ops(record))
+        c.showPage()
+    c.save()
@@ -0,0 +1,99 @@
+"""
+Write-ahead log for the label app's small mutations.
+
+Adding an autocomplete value or a new medicine used to rewrite a whole
+file (autocomplete.json, remedies.xlsx). Instead each mutation is first
+appended as one JSON line to records/wal.jsonl and fsync'd; the snapshot
+files are checkpointed lazily (on exit, or once the log grows) and the log
+is replayed over them on startup, so a power cut mid-write loses nothing
+that was acknowledged. Replaying an entry that already reached its
+snapshot is harmless: a medicine entry only adds a name that is missing,
+and an autocomplete entry carries its time and is skipped when the
+snapshot has a later use of that value.
+
+Printed label records have their own append-only journal
+(`records_journal`) and are not duplicated here.
+"""
+
+import json
+import logging
+import os
+import threading
+
+# Entry kinds
+AUTOCOMPLETE = "autocomplete"
+MEDICINE = "medicine"
+
+
+class MutationLog:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._count = 0
+        self._repair_tail()
+        self._count = len(self.entries())
+
+    def __len__(self):
+        return self._count
+
+    def _repair_tail(self):
+        # A crash mid-append can leave a torn last line; terminate it so it is skipped.
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return
+        with open(self.path, "rb+") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+                logging.warning(f"Terminated a torn last line in {self.path}.")
+
+    def append(self, op, **payload):
+        """Durably log one mutation before it is applied."""
+        self.append_many([dict(payload, op=op)])
+
+    def append_many(self, entries):
+        """Durably log several mutations (dicts with an "op" key) with one write and fsync."""
+        if not entries:
+            return
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("".join(json.dumps(e, ensure_ascii=False) + "\n" for e in entries))
+                f.flush()
+                os.fsync(f.fileno())
+            self._count += len(entries)
+
+    def entries(self, op=None):
+        """Logged entries in order, optionally only those of one kind."""
+        with self._lock:
+            if not os.path.exists(self.path):
+                return []
+            with open(self.path, "r", encoding="utf-8") as f:
+                lines = f.readlines()
+        found = []
+        for n, line in enumerate(lines, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                logging.warning(f"Skipping damaged line {n} in {self.path}.")
+                continue
+            if op is None or entry.get("op") == op:
+                found.append(entry)
+        return found
+
+    def checkpoint(self, op):
+        """Drop the entries of one kind once its snapshot file has been written."""
+        with self._lock:
+            entries = self.entries()
+            keep = [e for e in entries if e.get("op") != op]
+            if len(keep) == len(entries):
+                return
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write("".join(json.dumps(e, ensure_ascii=False) + "\n" for e in keep))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+            self._count = len(keep)
+        logging.info(f"Checkpointed {len(entries) - len(keep)} {op} entries from {self.path}.")
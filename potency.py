@@ -0,0 +1,146 @@
+"""
+Homeopathic potency parsing.
+
+Potencies are typed as free text ("200CH", "200 C", "1000CH", "1M", "6X",
+"LM 0/3", "Q"), so one potency turns up under several spellings.
+`parse_potency` turns a spelling into a canonical (scale, value) tuple:
+
+    C   centesimal; "CH" is the same scale, M = 1000C, CM = 100000C, MM = 1000000C
+    X   decimal ("D", "DH")
+    LM  fifty-millesimal ("LM 3", "LM3", "0/3")
+    Q   mother tincture ("Q", "MT", "Ø"), value 0
+
+so "1000C" and "1M" compare equal. The usual potencies are expanded into a
+lookup table of spellings when the module is imported, making validation
+and completion a dict lookup or a bisect; anything else falls back to one
+regex match (cached), cheap enough for every keystroke and bulk imports.
+"""
+
+import functools
+import re
+from bisect import bisect_left
+
+COMMON = {
+    "C": [3, 6, 12, 15, 30, 200, 1000, 10000, 50000, 100000, 1000000],
+    "X": [1, 2, 3, 6, 12, 30],
+    "LM": list(range(1, 31)),
+    "Q": [0],
+}
+# Millesimal letters on the centesimal scale.
+_C_MULTIPLES = {"M": 1000, "CM": 100000, "MM": 1000000}
+
+_POTENCY_RE = re.compile(r"""
+    (?:(?P<n>\d+)(?P<unit>CH|C|X|DH|D|M|CM|MM)?        # 200CH, 30, 6X, 10M
+      |(?P<unit_only>CM|MM|M)                          # CM, MM
+      |(?:LM(?:0/)?|0/)(?P<lm>\d+)                      # LM3, LM0/3, 0/3
+      |(?P<mt>Q|MT|Ø|MOTHERTINCTURE))$""", re.X)
+
+
+# A dot between digits is a decimal point ("0.5"), not an abbreviation dot ("L.M. 3", "200 C.").
+_DECIMAL_RE = re.compile(r"\d\s*\.\s*\d")
+
+
+def _compact(text):
+    return re.sub(r"[\s.]+", "", str(text).upper())
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse(compact):
+    if compact in _TABLE:
+        return _TABLE[compact]
+    m = _POTENCY_RE.match(compact)
+    if not m:
+        return None
+    if m.group("mt"):
+        return ("Q", 0)
+    lm = m.group("lm")
+    if lm:
+        return ("LM", int(lm))
+    unit = m.group("unit_only")
+    if unit:
+        return ("C", _C_MULTIPLES[unit])
+    n, unit = int(m.group("n")), m.group("unit") or "C"
+    if unit in ("X", "D", "DH"):
+        return ("X", n)
+    return ("C", n * _C_MULTIPLES.get(unit, 1))
+
+
+def parse_potency(text):
+    """(scale, value) for a potency spelling, or None if it is not one."""
+    if not text or _DECIMAL_RE.search(str(text)):
+        return None
+    return _parse(_compact(text))
+
+
+def format_potency(potency):
+    """Display form of a (scale, value) tuple: ("C", 1000) -> "1M"."""
+    scale, value = potency
+    if scale == "Q":
+        return "Q"
+    if scale == "LM":
+        return f"LM {value}"
+    if scale == "X":
+        return f"{value}X"
+    for unit, size in sorted(_C_MULTIPLES.items(), key=lambda kv: -kv[1]):
+        if value >= size and value % size == 0:
+            count = value // size
+            return unit if count == 1 and unit != "M" else f"{count}{unit}"
+    return f"{value}C"
+
+
+def potency_key(text):
+    """Canonical text key ("C:1000") for grouping and indexing, or None if `text` is not a potency."""
+    potency = parse_potency(text)
+    return None if potency is None else f"{potency[0]}:{potency[1]}"
+
+
+def canonical_potency(text):
+    """The display form of `text` if it parses ("1000CH" -> "1M"), else `text` unchanged."""
+    potency = parse_potency(text)
+    return text if potency is None else format_potency(potency)
+
+
+def _spellings(scale, value):
+    if scale == "Q":
+        return ["Q", "MT", "Ø"]
+    if scale == "LM":
+        return [f"LM{value}", f"LM0/{value}", f"0/{value}"]
+    if scale == "X":
+        return [f"{value}X", f"{value}D", f"{value}DH"]
+    found = [str(value), f"{value}C", f"{value}CH"]
+    for unit, size in _C_MULTIPLES.items():
+        if value % size == 0:
+            count = value // size
+            found.append(f"{count}{unit}")
+            if count == 1:
+                found.append(unit)
+    return found
+
+
+def _build_table():
+    table = {}
+    for scale, values in COMMON.items():
+        for value in values:
+            for spelling in _spellings(scale, value):
+                table.setdefault(spelling, (scale, value))
+    return table
+
+
+_TABLE = _build_table()
+_SORTED = sorted(_TABLE)
+COMMON_POTENCIES = [format_potency((scale, value)) for scale, values in COMMON.items() for value in values]
+
+
+def complete(prefix, limit=10):
+    """Display forms of the common potencies that have a spelling starting with `prefix`."""
+    prefix = _compact(prefix)
+    found = []
+    for spelling in _SORTED[bisect_left(_SORTED, prefix):]:
+        if not spelling.startswith(prefix):
+            break
+        display = format_potency(_TABLE[spelling])
+        if display not in found:
+            found.append(display)
+            if len(found) == limit:
+                break
+    return found
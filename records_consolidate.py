@@ -0,0 +1,248 @@
+"""
+Consolidate label records from every deployment copy into one journal.
+
+Copies of the app have been run from several folders (records/,
+dist/records/, final build/records/, HomeoApp/..., and the AppData folder
+used by HomeoApp's `get_records_file`), each keeping its own records.xlsx
+and autocomplete.json. `consolidate` reads all of them (workbooks are
+streamed with openpyxl in read-only mode), normalizes the differing column
+layouts, drops duplicates by content hash and writes the result, ordered
+by print time, into a fresh month-partitioned journal plus records.xlsx.
+Each source's new records are sorted and spilled to a temporary file, and
+the runs are merged from those files, so only one source is held in memory.
+
+A row is a duplicate when the same content has already been seen as many
+times as it occurs in its own source: two copies of the same workbook
+merge into one, while a label genuinely printed twice keeps both rows.
+
+Usage: python records_consolidate.py [ROOT] [--out records/consolidated] [--replace]
+"""
+
+import argparse
+import hashlib
+import heapq
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime
+
+from openpyxl import load_workbook
+
+from autocomplete_store import AutocompleteStore
+from records_journal import RecordsJournal
+
+# Folders (relative to the install root) that deployment copies keep their stores in.
+RECORD_FOLDERS = ["records", "dist/records", "final build/records", "HomeoApp/records",
+                  "HomeoApp/dist/records", ".", "HomeoApp", "final build", "dist"]
+BATCH_SIZE = 5000
+
+
+def appdata_records():
+    """The records.xlsx HomeoApp keeps under %APPDATA% (see HomeoApp's `get_records_file`)."""
+    appdata = os.getenv("APPDATA")
+    return os.path.join(appdata, "HomeoLabelApp", "records.xlsx") if appdata else None
+
+
+def discover_sources(root):
+    """Record stores under `root` and in AppData: records.xlsx workbooks, journals and old records.jsonl."""
+    found, seen = [], set()
+
+    def add(path):
+        path = os.path.normpath(path)
+        real = os.path.realpath(path)
+        if os.path.exists(path) and real not in seen:
+            seen.add(real)
+            found.append(path)
+
+    for folder in RECORD_FOLDERS:
+        base = os.path.join(root, folder)
+        add(os.path.join(base, "journal"))
+        add(os.path.join(base, "records.jsonl"))
+        add(os.path.join(base, "records.xlsx"))
+    appdata = appdata_records()
+    if appdata:
+        add(appdata)
+    return found
+
+
+def discover_autocomplete(root):
+    paths = [os.path.join(root, folder, "autocomplete.json") for folder in RECORD_FOLDERS]
+    appdata = appdata_records()
+    if appdata:
+        paths.append(os.path.join(os.path.dirname(appdata), "autocomplete.json"))
+    return [p for p in paths if os.path.exists(p)]
+
+
+def normalize_record(row):
+    """A record with stripped string values, empty cells dropped and older layouts mapped to the current one."""
+    rec = {}
+    for key, value in row.items():
+        if key is None or value is None or value != value:  # NaN
+            continue
+        if isinstance(value, datetime):
+            value = value.isoformat(timespec="seconds")
+        elif isinstance(value, float) and value.is_integer():
+            value = int(value)
+        value = str(value).strip()
+        if value:
+            rec[str(key).strip()] = value
+    # Early versions stored the schedule as "Times".
+    times = rec.pop("Times", None)
+    if times is not None:
+        if rec.setdefault("Time", times) != times:
+            rec["Times"] = times
+    if "Timestamp" in rec:
+        rec["Timestamp"] = rec["Timestamp"].replace(" ", "T", 1)
+    return rec
+
+
+def read_source(path):
+    """Yield the raw records of one store."""
+    if os.path.isdir(path):
+        yield from RecordsJournal(path, os.devnull).records()
+    elif path.lower().endswith(".xlsx"):
+        wb = load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = wb.worksheets[0].iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            for values in rows:
+                yield dict(zip(header, values))
+        finally:
+            wb.close()
+    else:
+        yield from RecordsJournal._read(path)
+
+
+def _content_hash(rec):
+    return hashlib.sha1(json.dumps(rec, sort_keys=True, ensure_ascii=False).encode("utf-8")).digest()
+
+
+def _sort_key(rec):
+    # Undated (oldest) records first, then by print time.
+    return rec.get("Timestamp", "")
+
+
+def _spill(run, spill_dir):
+    # One sorted run per temporary JSONL file, so only the source being read is held in memory.
+    fd, path = tempfile.mkstemp(suffix=".jsonl", dir=spill_dir)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.writelines(json.dumps(rec, ensure_ascii=False) + "\n" for rec in run)
+    return path
+
+
+def _read_run(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def consolidate(sources, out_dir, progress=None):
+    """Merge `sources` into a new journal at `out_dir`. Returns (records read, records kept)."""
+    if os.path.exists(out_dir) and os.listdir(out_dir):
+        raise FileExistsError(f"{out_dir} is not empty")
+    with tempfile.TemporaryDirectory(prefix="consolidate-") as spill_dir:
+        return _consolidate(sources, out_dir, spill_dir, progress)
+
+
+def _consolidate(sources, out_dir, spill_dir, progress):
+    kept, read, runs = set(), 0, []
+    for path in sources:
+        occurrences, run = {}, []
+        for row in read_source(path):
+            rec = normalize_record(row)
+            if not rec:
+                continue
+            read += 1
+            digest = _content_hash(rec)
+            # k-th copy of this content within its own source
+            n = occurrences[digest] = occurrences.get(digest, 0) + 1
+            key = digest + n.to_bytes(4, "big")
+            if key not in kept:
+                kept.add(key)
+                run.append(rec)
+        # Journals and workbooks are nearly in print order already, so this sort is cheap.
+        run.sort(key=_sort_key)
+        runs.append(_spill(run, spill_dir))
+        logging.info(f"Read {path}: {sum(occurrences.values())} records, {len(run)} new.")
+        if progress:
+            progress(path, sum(occurrences.values()), len(run))
+
+    journal = RecordsJournal(out_dir, os.path.join(out_dir, "records.xlsx"))
+    batch = []
+    for rec in heapq.merge(*map(_read_run, runs), key=_sort_key):
+        batch.append(rec)
+        if len(batch) >= BATCH_SIZE:
+            journal.append_many(batch)
+            batch = []
+    journal.append_many(batch)
+    return read, len(kept)
+
+
+def merge_autocomplete(paths):
+    """An AutocompleteStore holding the values of several autocomplete.json files, usage summed."""
+    merged = AutocompleteStore()
+    for path in paths:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            # files without usage data count their values as used when the file was saved
+            merged.update(AutocompleteStore.from_json(data, now=os.path.getmtime(path)))
+        except (OSError, ValueError, AttributeError) as e:
+            logging.warning(f"Skipping {path}: {e}")
+    return merged
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge label records from every deployment copy.")
+    parser.add_argument("root", nargs="?", default=".", help="install folder to search (default: current)")
+    parser.add_argument("--out", default=os.path.join("records", "consolidated"),
+                        help="new journal folder to write (must not exist or be empty)")
+    parser.add_argument("--replace", action="store_true",
+                        help="make the result records/journal and autocomplete.json (close the app first; "
+                             "the old journal is kept as a backup)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    sources = discover_sources(args.root)
+    if not sources:
+        parser.error(f"no record stores found under {args.root}")
+    start = time.perf_counter()
+    read, kept = consolidate(sources, args.out)
+    journal = RecordsJournal(args.out, os.path.join(args.out, "records.xlsx"))
+    journal.export_excel()
+    autocomplete = merge_autocomplete(discover_autocomplete(args.root))
+    with open(os.path.join(args.out, "autocomplete.json"), "w", encoding="utf-8") as f:
+        json.dump(autocomplete.to_json(), f)
+    print(f"Merged {read} records from {len(sources)} stores into {kept} "
+          f"in {time.perf_counter() - start:.1f}s: {args.out}")
+
+    if args.replace:
+        records = os.path.join(args.root, "records")
+        live = os.path.join(records, "journal")
+        if os.path.exists(live):
+            backup = f"{live}.bak-{datetime.now():%Y%m%d-%H%M%S}"
+            os.replace(live, backup)
+            print(f"Previous journal kept at {backup}")
+        os.makedirs(records, exist_ok=True)
+        for name in os.listdir(args.out):
+            if name.endswith(".jsonl"):
+                os.makedirs(live, exist_ok=True)
+                target = os.path.join(live, name)
+                shutil.move(os.path.join(args.out, name), target)
+                # A move keeps the old mtime; touch the partition so records.xlsx counts as stale.
+                os.utime(target)
+        shutil.copy(os.path.join(args.out, "autocomplete.json"), os.path.join(records, "autocomplete.json"))
+        # The index is derived from the journal; the app rebuilds it on the next start.
+        db = os.path.join(records, "records.db")
+        if os.path.exists(db):
+            os.remove(db)
+        print(f"{live} now holds the consolidated records; records.xlsx is regenerated on the next start.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,484 @@
+"""
+Append-only journal of printed label records.
+
+Every printed label is one JSON line appended to its month's partition
+(records/journal/YYYY-MM.jsonl) and fsync'd, so saving a record costs the
+same whether the history holds ten labels or ten thousand, and reads for a
+date range only open the months it covers. records.xlsx is no longer read
+and rewritten per print: it is regenerated from the journal by
+`export_excel` (on exit or on demand), and only when the journal changed
+since the last export. Exports stream rows into a write-only workbook, so
+they run in constant memory and can be limited to a date range or shop;
+`python records_journal.py export out.xlsx --start ... --shop ...` does the
+same from a command line.
+
+`RecordsWriter` moves that append off the GUI thread: printing hands the
+record to a queue and returns, and a writer thread commits records in
+batches, retrying while the journal is locked.
+"""
+
+import argparse
+import json
+import logging
+import os
+import queue
+import re
+import sys
+import threading
+import time
+
+import pandas as pd
+from openpyxl import Workbook
+
+# Leading columns of exported workbooks; Quantity only appears on labels imported from the
+# old records.xlsx. Any other keys the records carry follow in first-seen order.
+EXPORT_COLUMNS = ["Medicine", "Potency", "Dose", "Quantity", "Time", "Shop", "Branch/Phone", "Timestamp"]
+PROGRESS_EVERY = 5000
+
+
+UNDATED = "undated"
+_PARTITION_RE = re.compile(r"^(\d{4}-\d{2}|undated)\.jsonl$")
+
+
+def partition_key(record):
+    """Month partition ("YYYY-MM") of a record, or "undated" when it has no timestamp."""
+    ts = str(record.get("Timestamp") or "")
+    return ts[:7] if re.match(r"\d{4}-\d{2}", ts) else UNDATED
+
+
+def _cell(value):
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+class RecordsJournal:
+    """Month-partitioned journal: one records/journal/YYYY-MM.jsonl per month.
+
+    Each record goes to the partition of its timestamp, so an append only
+    touches the current month and a date-bounded read only opens the months
+    it covers. Labels from before timestamps were recorded live in
+    undated.jsonl. `legacy_paths` are monolithic stores (the old
+    records.jsonl, records.xlsx) split into partitions on first use.
+    """
+
+    def __init__(self, directory, xlsx_path, legacy_paths=()):
+        self.directory = directory
+        self.xlsx_path = xlsx_path
+        self.legacy_paths = list(legacy_paths)
+        # Records that could not be journaled before exit; merged in on the next start.
+        self.spool_path = os.path.join(directory, "pending.spool")
+        self._ready = False
+        self._lock = threading.RLock()
+
+    def _open(self):
+        # Deferred to first use: records.xlsx may be locked by Excel at startup.
+        with self._lock:
+            if self._ready:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            if not self.partitions():
+                for path in self.legacy_paths:
+                    if os.path.exists(path):
+                        self.import_legacy(path)
+                        if path.lower().endswith(".jsonl"):
+                            os.replace(path, path + ".imported")
+                        break
+            for key in self.partitions():
+                self._repair_tail(self.partition_path(key))
+            self._ready = True
+
+    # ------------------ Partitions ------------------
+    def partition_path(self, key):
+        return os.path.join(self.directory, f"{key}.jsonl")
+
+    def partitions(self, start=None, end=None):
+        """Partition keys in time order ("undated" first), pruned to [start, end) when given.
+
+        `start` and `end` are ISO dates or timestamps; undated records fall
+        outside every date range.
+        """
+        if not os.path.isdir(self.directory):
+            return []
+        keys = sorted((m.group(1) for m in map(_PARTITION_RE.match, os.listdir(self.directory)) if m),
+                      key=lambda k: (k != UNDATED, k))
+        if start is None and end is None:
+            return keys
+        return [k for k in keys if k != UNDATED
+                and (start is None or k >= str(start)[:7])
+                and (end is None or k <= str(end)[:7])]
+
+    def import_legacy(self, path):
+        """Split a monolithic records.xlsx or .jsonl into month partitions. Returns the row count."""
+        if path.lower().endswith(".xlsx"):
+            df = pd.read_excel(path, engine="openpyxl")
+            rows = df.astype(object).where(df.notna(), None).to_dict("records")
+        else:
+            rows = list(self._read(path))
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            self._append_grouped(rows)
+        logging.info(f"Imported {len(rows)} records from {path} into {self.directory}.")
+        return len(rows)
+
+    @staticmethod
+    def _repair_tail(path):
+        # A crash mid-append can leave a torn last line; terminate it so the next
+        # record starts on its own line (the torn line is skipped when reading).
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return
+        with open(path, "rb+") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+                logging.warning(f"Terminated a torn last line in {path}.")
+
+    # ------------------ Writes ------------------
+    @staticmethod
+    def _write_lines(path, records):
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in records))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _append_grouped(self, records):
+        groups = {}
+        for r in records:
+            groups.setdefault(partition_key(r), []).append(r)
+        for key, group in groups.items():
+            self._write_lines(self.partition_path(key), group)
+
+    def append(self, record):
+        """Durably append one record (a dict) to its month's partition."""
+        self.append_many([record])
+
+    def append_many(self, records):
+        """Durably append several records, one write and fsync per partition touched."""
+        self._open()
+        with self._lock:
+            self._append_grouped(records)
+
+    def spool(self, records):
+        """Park records that could not be journaled; `recover` merges them later."""
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            self._write_lines(self.spool_path, records)
+
+    def recover(self):
+        """Merge records spooled by an earlier session into the journal. Returns their count."""
+        # Import a legacy records.xlsx first, so whatever indexes the journal next sees its rows.
+        self._open()
+        with self._lock:
+            if not os.path.exists(self.spool_path):
+                return 0
+            spooled = list(self._read(self.spool_path))
+            if spooled:
+                self.append_many(spooled)
+            os.remove(self.spool_path)
+        logging.info(f"Recovered {len(spooled)} pending records into {self.directory}.")
+        return len(spooled)
+
+    # ------------------ Reads ------------------
+    @staticmethod
+    def _read(path):
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+        for n, line in enumerate(lines, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                logging.warning(f"Skipping damaged line {n} in {path}.")
+
+    def _snapshot(self, start=None, end=None):
+        # Partition sizes taken under the lock: reading up to them sees a consistent
+        # journal without holding the lock while appends continue.
+        self._open()
+        with self._lock:
+            return [(k, self.size(k)) for k in self.partitions(start, end)]
+
+    def _stream(self, key, size):
+        # Yields (record, bytes read so far) for the lines within the first `size` bytes.
+        read = 0
+        with open(self.partition_path(key), "rb") as f:
+            for n, line in enumerate(f, 1):
+                read += len(line)
+                if read > size:
+                    break
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line), read
+                except ValueError:
+                    logging.warning(f"Skipping damaged line {n} in {self.partition_path(key)}.")
+
+    def records(self, start=None, end=None, shop=None, progress=None):
+        """Yield records in print order, streaming only the partitions overlapping [start, end).
+
+        `shop` keeps records of that shop only. `progress(done, total)` is
+        called every few thousand records with the journal bytes read so far
+        and the bytes to read.
+        """
+        start = None if start is None else str(start)
+        end = None if end is None else str(end)
+        return self._records(self._snapshot(start, end), start, end, shop, progress)
+
+    def _records(self, snapshot, start, end, shop, progress):
+        total = sum(size for _, size in snapshot)
+        done = 0
+        for key, size in snapshot:
+            for n, (rec, read) in enumerate(self._stream(key, size), 1):
+                if progress and n % PROGRESS_EVERY == 0:
+                    progress(done + read, total)
+                ts = str(rec.get("Timestamp") or "")
+                if ((start is None or ts >= start) and (end is None or ts < end)
+                        and (shop is None or rec.get("Shop") == shop)):
+                    yield rec
+            done += size
+        if progress:
+            progress(total, total)
+
+    def size(self, key):
+        """Size of a partition in bytes."""
+        path = self.partition_path(key)
+        return os.path.getsize(path) if os.path.exists(path) else 0
+
+    def read_from(self, key, offset):
+        """(records, end offset) for the complete lines of a partition after byte `offset`."""
+        self._open()
+        path = self.partition_path(key)
+        with self._lock:
+            if not os.path.exists(path):
+                return [], 0
+            with open(path, "rb") as f:
+                f.seek(offset)
+                data = f.read()
+        # A line still being written has no newline yet; leave it for the next call.
+        end = data.rfind(b"\n") + 1
+        records = []
+        for line in data[:end].decode("utf-8").splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                logging.warning(f"Skipping damaged line in {path}.")
+        return records, offset + end
+
+    @property
+    def stale(self):
+        """True when records.xlsx is missing or older than the newest partition."""
+        mtimes = [os.path.getmtime(self.partition_path(k)) for k in self.partitions()]
+        if not mtimes:
+            return False
+        if not os.path.exists(self.xlsx_path):
+            return True
+        return os.path.getmtime(self.xlsx_path) < max(mtimes)
+
+    def export_excel(self, xlsx_path=None, start=None, end=None, shop=None, progress=None):
+        """Write records to records.xlsx (or `xlsx_path`). Returns the row count.
+
+        Rows stream from the journal into a write-only workbook, so memory
+        stays flat however long the history is; the journal is read twice,
+        once for the column set. `start`, `end`, `shop` and `progress` are
+        as for `records`.
+        """
+        xlsx_path = xlsx_path or self.xlsx_path
+        start = None if start is None else str(start)
+        end = None if end is None else str(end)
+        snapshot = self._snapshot(start, end)
+        # A write-only sheet needs its header first, so a first pass over the same snapshot
+        # collects the keys beyond EXPORT_COLUMNS (old workbook columns, "Times", ...);
+        # re-importing the export then gives back every field.
+        columns = dict.fromkeys(EXPORT_COLUMNS)
+        scaled = progress and (lambda done, total: progress(done, 2 * total))
+        for rec in self._records(snapshot, start, end, shop, scaled):
+            columns.update(dict.fromkeys(rec))
+        columns = list(columns)
+        scaled = progress and (lambda done, total: progress(total + done, 2 * total))
+        # Write next to the target and swap in, so a failed export never truncates the old file.
+        tmp = xlsx_path + ".tmp.xlsx"
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet()
+        ws.append(columns)
+        count = 0
+        try:
+            for rec in self._records(snapshot, start, end, shop, scaled):
+                ws.append([_cell(rec.get(c)) for c in columns])
+                count += 1
+            wb.save(tmp)
+            os.replace(tmp, xlsx_path)
+        except Exception:
+            # e.g. records.xlsx is open in Excel; keep the journal as the source of truth.
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        logging.info(f"Exported {count} records to {xlsx_path}.")
+        return count
+
+
+class RecordsWriter:
+    """Writer thread that persists label records behind the print path.
+
+    `submit` only queues the record. The thread commits records in batches
+    of up to `batch_size`, or whatever arrived within `max_delay` seconds,
+    and retries with backoff while the journal is locked (antivirus, backup
+    or a network share), so printing is never blocked or aborted. On start
+    it recovers records spooled by an earlier session and regenerates a
+    records.xlsx that an unclean exit left stale. `close` flushes the queue;
+    records still unwritable at the deadline are spooled for next start.
+    An optional `repository` (see `records_store`) is caught up after every
+    committed batch.
+    """
+
+    _STOP = object()
+
+    def __init__(self, journal, repository=None, batch_size=20, max_delay=0.5, retry_delay=0.25,
+                 max_retry_delay=5.0):
+        self.journal = journal
+        self.repository = repository
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self._queue = queue.Queue()
+        self._closing = threading.Event()
+        self._close_deadline = None
+        self._thread = threading.Thread(target=self._run, name="records-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, record):
+        self._queue.put(record)
+
+    def flush(self, timeout=None):
+        """Wait until every submitted record is written. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def close(self, timeout=5.0):
+        """Flush and stop the thread, spooling what cannot be written within `timeout`."""
+        self._close_deadline = time.monotonic() + timeout
+        self._closing.set()
+        self._queue.put(self._STOP)
+        self._thread.join()
+
+    def _run(self):
+        self._recover()
+        while True:
+            item = self._queue.get()
+            if item is self._STOP:
+                self._queue.task_done()
+                return
+            batch, stop = [item], False
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.batch_size and not self._closing.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is self._STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            self._write(batch)
+            self._index()
+            for _ in batch:
+                self._queue.task_done()
+            if stop:
+                self._queue.task_done()
+                return
+
+    def _write(self, batch):
+        delay = self.retry_delay
+        while True:
+            try:
+                self.journal.append_many(batch)
+                return
+            except OSError as e:
+                if self._closing.is_set() and time.monotonic() >= self._close_deadline:
+                    self._spool(batch)
+                    return
+                logging.warning(f"Records journal busy ({e}); retrying in {delay:.2f}s.")
+                if self._closing.is_set():
+                    time.sleep(min(delay, max(0.0, self._close_deadline - time.monotonic())))
+                else:
+                    # cut the wait short when close() starts its deadline
+                    self._closing.wait(delay)
+                delay = min(delay * 2, self.max_retry_delay)
+            except Exception as e:
+                # not a busy file, so retrying will not help; keep the batch and the thread alive
+                logging.error(f"Records journal write failed ({e!r}); spooling {len(batch)} records.")
+                self._spool(batch)
+                return
+
+    def _spool(self, batch):
+        try:
+            self.journal.spool(batch)
+            logging.warning(f"Spooled {len(batch)} records to {self.journal.spool_path} for the next start.")
+        except Exception as e:
+            logging.error(f"Lost {len(batch)} records, journal and spool unwritable: {e!r} {batch}")
+
+    def _index(self):
+        if self.repository is None:
+            return
+        try:
+            self.repository.catch_up(self.journal)
+        except Exception as e:
+            # the index is derived data; the next batch or start catches up
+            logging.error(f"Records index update failed: {e}")
+
+    def _recover(self):
+        try:
+            self.journal.recover()
+            if self.journal.stale:
+                self.journal.export_excel()
+        except Exception as e:
+            logging.error(f"Records recovery failed: {e}")
+        self._index()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Label records journal tools.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import", help="split a monolithic records.xlsx/.jsonl into month partitions")
+    imp.add_argument("source")
+    imp.add_argument("--journal", default=os.path.join("records", "journal"))
+    imp.add_argument("--force", action="store_true", help="import even if partitions already exist")
+    exp = sub.add_parser("export", help="stream records (optionally filtered) into an .xlsx workbook")
+    exp.add_argument("output")
+    exp.add_argument("--journal", default=os.path.join("records", "journal"))
+    exp.add_argument("--start", help="first print date, YYYY-MM-DD")
+    exp.add_argument("--end", help="print date to stop before, YYYY-MM-DD")
+    exp.add_argument("--shop")
+    args = parser.parse_args()
+
+    journal = RecordsJournal(args.journal, os.path.join("records", "records.xlsx"))
+    if args.command == "import":
+        if journal.partitions() and not args.force:
+            parser.error(f"{args.journal} already has partitions; use --force to import again")
+        count = journal.import_legacy(args.source)
+        print(f"Imported {count} records into {', '.join(journal.partitions())}.")
+    else:
+        def progress(done, total):
+            print(f"\r{done * 100 // max(total, 1)}%", end="", file=sys.stderr, flush=True)
+
+        count = journal.export_excel(args.output, args.start, args.end, args.shop, progress)
+        print(file=sys.stderr)
+        print(f"Exported {count} records to {args.output}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,383 @@
+"""
+Indexed SQLite view of the printed label records.
+
+The records journal (see `records_journal`) stays the durable source of
+truth; `RecordsRepository` indexes it into records/records.db with indexes
+on timestamp, medicine and shop, so "what did we print for X last week" is
+an index lookup instead of opening Excel. The repository remembers how far
+into each monthly partition it has read and `catch_up` indexes only the new
+lines; it can always be rebuilt from the journal.
+
+The same transaction that indexes a record bumps its usage counters: labels
+per day, month and overall, broken down by medicine, potency, shop, branch
+and hour. A "today / this month" dashboard is then a read of a few counter
+rows, however long the history. It also counts which potency, dose and
+time were printed with each medicine (see PREDICTIONS), so `predict` can
+pre-fill the label form from what was printed most often before.
+
+Potencies are typed in many spellings ("1000CH", "1M"); each record also
+stores its `potency_key`, and counters and predictions use the canonical
+potency (see `potency`), so one potency is counted and found as one.
+"""
+
+import functools
+import json
+import logging
+import os
+import sqlite3
+import threading
+
+from potency import canonical_potency, potency_key
+
+# Journal keys with their own column; anything else is kept in `extra`.
+COLUMNS = {
+    "Timestamp": "ts",
+    "Medicine": "medicine",
+    "Potency": "potency",
+    "Dose": "dose",
+    "Quantity": "quantity",
+    "Time": "time",
+    "Shop": "shop",
+    "Branch/Phone": "branch_phone",
+}
+
+# Usage counter dimensions and the journal key each one counts.
+STAT_DIMENSIONS = {
+    "medicine": "Medicine",
+    "potency": "Potency",
+    "shop": "Shop",
+    "branch": "Branch/Phone",
+}
+# Field -> record keys whose values condition it, most specific first.
+# A dose is predicted from medicine + potency, else the medicine alone;
+# a time from medicine + potency + dose, else from the dose alone.
+PREDICTIONS = {
+    "Potency": [("Medicine",)],
+    "Dose": [("Medicine", "Potency"), ("Medicine",)],
+    "Time": [("Medicine", "Potency", "Dose"), ("Dose",)],
+}
+# Counters are kept per day ("YYYY-MM-DD"), per month ("YYYY-MM") and overall.
+ALL_TIME = "all"
+# Bumped when `potency` parses some spelling differently, so stored potency keys are recomputed.
+POTENCY_RULES = 2
+
+
+def _locked(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def _text(value):
+    return None if value is None or value == "" else str(value)
+
+
+def _value(record, field):
+    """A record value as counted and predicted: potencies in their canonical form."""
+    value = _text(record.get(field))
+    if value is not None and field == "Potency":
+        value = canonical_potency(value)
+    return value
+
+
+class RecordsRepository:
+    def __init__(self, db_path):
+        self.db_path = db_path
+        # The writer thread indexes while the GUI queries; the lock serializes the connection.
+        self._lock = threading.RLock()
+        try:
+            self.conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._init_schema()
+        except sqlite3.DatabaseError as e:
+            # Everything here is derived from the journal; set the damaged file aside and re-index.
+            logging.error(f"{db_path} is damaged ({e}); rebuilding it from the journal.")
+            self.conn.close()
+            os.replace(db_path, db_path + ".corrupt")
+            self.conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._init_schema()
+
+    def _init_schema(self):
+        with self.conn:
+            self.conn.execute("""CREATE TABLE IF NOT EXISTS records (
+                id INTEGER PRIMARY KEY,
+                ts TEXT,
+                medicine TEXT,
+                potency TEXT,
+                dose TEXT,
+                quantity TEXT,
+                time TEXT,
+                shop TEXT,
+                branch_phone TEXT,
+                extra TEXT,
+                potency_key TEXT)""")
+            columns = {r[1] for r in self.conn.execute("PRAGMA table_info(records)")}
+            if "potency_key" not in columns:
+                self.conn.execute("ALTER TABLE records ADD COLUMN potency_key TEXT")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS records_ts ON records(ts)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS records_medicine ON records(medicine)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS records_shop ON records(shop)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS records_potency ON records(potency_key)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            derived = {r[0] for r in self.conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ('stats', 'cooccurrence')")}
+            self.conn.execute("""CREATE TABLE IF NOT EXISTS stats (
+                period TEXT NOT NULL,
+                dim TEXT NOT NULL,
+                key TEXT NOT NULL,
+                n INTEGER NOT NULL,
+                PRIMARY KEY (period, dim, key)) WITHOUT ROWID""")
+            self.conn.execute("""CREATE TABLE IF NOT EXISTS cooccurrence (
+                context TEXT NOT NULL,
+                field TEXT NOT NULL,
+                value TEXT NOT NULL,
+                n INTEGER NOT NULL,
+                PRIMARY KEY (context, field, value)) WITHOUT ROWID""")
+            if len(derived) < 2 or "potency_key" not in columns or self._get_meta("potency_rules") != POTENCY_RULES:
+                # Indexed before these counters or potency keys existed, or with older potency
+                # rules: re-read the journal to fill them.
+                self.conn.execute("DELETE FROM meta WHERE key = 'journal_offsets'")
+                self._set_meta("potency_rules", POTENCY_RULES)
+
+    # ------------------ Meta ------------------
+    def _get_meta(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def _set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta(key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    # ------------------ Indexing ------------------
+    @staticmethod
+    def _row(record):
+        extra = {k: v for k, v in record.items() if k not in COLUMNS and v not in (None, "")}
+        return tuple(_text(record.get(k)) for k in COLUMNS) + (
+            json.dumps(extra, ensure_ascii=False, default=str) if extra else None,
+            potency_key(record.get("Potency")))
+
+    def _insert(self, records):
+        self.conn.executemany(
+            f"INSERT INTO records({', '.join(COLUMNS.values())}, extra, potency_key) "
+            f"VALUES ({', '.join('?' * (len(COLUMNS) + 2))})",
+            [self._row(r) for r in records])
+        self._count(records)
+        self._learn(records)
+
+    @staticmethod
+    def _stat_keys(record):
+        """(dim, key) pairs a record counts towards; ("labels", "") is the total."""
+        keys = [("labels", "")]
+        for dim, field in STAT_DIMENSIONS.items():
+            value = _value(record, field)
+            if value:
+                keys.append((dim, value))
+        hour = str(record.get("Timestamp") or "")[11:13]
+        if hour:
+            keys.append(("hour", hour))
+        return keys
+
+    def _count(self, records):
+        counts = {}
+        for rec in records:
+            ts = str(rec.get("Timestamp") or "")
+            # Undated (imported) labels only count towards the all-time totals.
+            periods = [ALL_TIME] + ([ts[:10], ts[:7]] if len(ts) >= 10 else [])
+            for dim, key in self._stat_keys(rec):
+                for period in periods:
+                    counts[period, dim, key] = counts.get((period, dim, key), 0) + 1
+        self.conn.executemany(
+            "INSERT INTO stats(period, dim, key, n) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(period, dim, key) DO UPDATE SET n = n + excluded.n",
+            [k + (n,) for k, n in counts.items()])
+
+    @_locked
+    def catch_up(self, journal):
+        """Index journal lines added since the last call. Returns the number indexed."""
+        offsets = self._get_meta("journal_offsets")
+        if offsets is None:
+            # Never indexed, or indexed from the single-file journal.
+            return self.rebuild(journal)
+        indexed = 0
+        for key in journal.partitions():
+            offset = offsets.get(key, 0)
+            size = journal.size(key)
+            if size == offset:
+                continue
+            if size < offset:
+                # A partition was replaced; start over from the first line.
+                logging.warning(f"Partition {key} shrank below the indexed offset; rebuilding {self.db_path}.")
+                return self.rebuild(journal)
+            records, offsets[key] = journal.read_from(key, offset)
+            with self.conn:
+                self._insert(records)
+                self._set_meta("journal_offsets", offsets)
+            indexed += len(records)
+        return indexed
+
+    @_locked
+    def rebuild(self, journal):
+        """Drop the index and re-read every partition."""
+        offsets, count = {}, 0
+        with self.conn:
+            self.conn.execute("DELETE FROM records")
+            self.conn.execute("DELETE FROM stats")
+            self.conn.execute("DELETE FROM cooccurrence")
+            for key in journal.partitions():
+                records, offsets[key] = journal.read_from(key, 0)
+                self._insert(records)
+                count += len(records)
+            self._set_meta("journal_offsets", offsets)
+        logging.info(f"Indexed {count} records into {self.db_path}.")
+        return count
+
+    @staticmethod
+    def _context(keys, values):
+        """Lookup key for a combination of record values, or None if one is missing."""
+        parts = []
+        for k in keys:
+            value = _value(values, k)
+            if value is None:
+                return None
+            parts.append(f"{k}={value}")
+        return "\x1f".join(parts)
+
+    def _learn(self, records):
+        counts = {}
+        for rec in records:
+            for field, conditions in PREDICTIONS.items():
+                value = _value(rec, field)
+                if value is None:
+                    continue
+                for keys in conditions:
+                    context = self._context(keys, rec)
+                    if context is not None:
+                        counts[context, field, value] = counts.get((context, field, value), 0) + 1
+        self.conn.executemany(
+            "INSERT INTO cooccurrence(context, field, value, n) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(context, field, value) DO UPDATE SET n = n + excluded.n",
+            [k + (n,) for k, n in counts.items()])
+
+    # ------------------ Queries ------------------
+    @_locked
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+    @staticmethod
+    def _where(medicine=None, shop=None, start=None, end=None, potency=None):
+        """SQL condition and parameters for the `query` filters."""
+        where, params = [], []
+        if medicine:
+            prefix = medicine.strip().upper()
+            where.append("medicine >= ? AND medicine < ?")
+            params += [prefix, prefix + "\U0010ffff"]
+        if shop:
+            where.append("shop = ?")
+            params.append(shop)
+        if potency:
+            key = potency_key(potency)
+            # Any spelling of a potency finds all of them; free text matches as typed.
+            where.append("potency_key = ?" if key else "potency = ?")
+            params.append(key or potency)
+        if start:
+            where.append("ts >= ?")
+            params.append(str(start))
+        if end:
+            where.append("ts < ?")
+            params.append(str(end))
+        return (" WHERE " + " AND ".join(where) if where else ""), params
+
+    @_locked
+    def query(self, medicine=None, shop=None, start=None, end=None, potency=None, limit=200, offset=0):
+        """Records matching every given filter, newest first, as journal-style dicts.
+
+        `medicine` matches by prefix (labels store it upper-case, so the
+        index serves the range), `shop` exactly and `potency` by canonical
+        potency ("1M" also finds "1000CH"); `start` and `end` are ISO dates
+        or timestamps bounding the print time (`end` exclusive). Records
+        imported from the old records.xlsx have no timestamp and only match
+        queries without a date range.
+        """
+        where, params = self._where(medicine, shop, start, end, potency)
+        sql = f"SELECT {', '.join(COLUMNS.values())}, extra FROM records" + where
+        # ids follow journal order, i.e. print order
+        sql += " ORDER BY id DESC LIMIT ? OFFSET ?"
+        params += [int(limit), int(offset)]
+        found = []
+        for row in self.conn.execute(sql, params):
+            rec = {k: row[i] or "" for i, k in enumerate(COLUMNS)}
+            if row[-1]:
+                rec.update(json.loads(row[-1]))
+            found.append(rec)
+        return found
+
+    @_locked
+    def count_by_potency(self, medicine=None, shop=None, start=None, end=None):
+        """(potency, labels) pairs for the records matching the `query` filters, most printed first.
+
+        Spellings of one potency are counted together under its canonical
+        form; potencies that do not parse are grouped as typed.
+        """
+        where, params = self._where(medicine, shop, start, end)
+        counts = {}
+        for key, potency, n in self.conn.execute(
+                "SELECT potency_key, MIN(potency), COUNT(*) FROM records" + where +
+                " GROUP BY potency_key, CASE WHEN potency_key IS NULL THEN potency END", params):
+            if potency is None:
+                continue
+            label = canonical_potency(potency) if key else potency
+            counts[label] = counts.get(label, 0) + n
+        return sorted(counts.items(), key=lambda kv: (-kv[1], kv[0]))
+
+    @_locked
+    def top(self, period, dim, limit=10):
+        """Most frequent (key, count) pairs of a dimension for a day, month or ALL_TIME."""
+        return self.conn.execute(
+            "SELECT key, n FROM stats WHERE period = ? AND dim = ? ORDER BY n DESC, key LIMIT ?",
+            (period, dim, int(limit))).fetchall()
+
+    @_locked
+    def total(self, period):
+        """Labels printed in a day ("YYYY-MM-DD"), month ("YYYY-MM") or ALL_TIME."""
+        row = self.conn.execute(
+            "SELECT n FROM stats WHERE period = ? AND dim = 'labels' AND key = ''", (period,)).fetchone()
+        return row[0] if row else 0
+
+    @_locked
+    def per_hour(self, period):
+        """{hour ("00".."23"): labels} for a day or month."""
+        return dict(self.conn.execute(
+            "SELECT key, n FROM stats WHERE period = ? AND dim = 'hour'", (period,)).fetchall())
+
+    @_locked
+    def predict(self, medicine, potency=None, dose=None):
+        """Most likely {"Potency", "Dose", "Time"} values for a label, from past prints.
+
+        Given values are kept and condition the rest; missing ones are
+        predicted in turn, so a predicted potency selects the dose and that
+        the time. Fields with no history are left out.
+        """
+        known = {"Medicine": medicine, "Potency": potency, "Dose": dose}
+        predicted = {}
+        for field, conditions in PREDICTIONS.items():
+            if _text(known.get(field)) is not None:
+                continue
+            for keys in conditions:
+                context = self._context(keys, known)
+                if context is None:
+                    continue
+                row = self.conn.execute(
+                    "SELECT value FROM cooccurrence WHERE context = ? AND field = ? ORDER BY n DESC, value LIMIT 1",
+                    (context, field)).fetchone()
+                if row:
+                    predicted[field] = known[field] = row[0]
+                    break
+        return predicted
+
+    @_locked
+    def shops(self):
+        return [r[0] for r in self.conn.execute(
+            "SELECT DISTINCT shop FROM records WHERE shop IS NOT NULL ORDER BY shop")]
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,37 @@
+"""
+Helpers shared by the remedy catalog modules.
+
+`file_fingerprint` identifies a remedies.xlsx by size, mtime and SHA-1, so
+`RemedyStore` re-imports the workbook only when it really changed (an
+unchanged launch never parses it). `normalize_name` is the name
+normalization every search and lookup uses.
+"""
+
+import hashlib
+import os
+import re
+import unicodedata
+
+
+def file_fingerprint(path, with_hash=True):
+    """Return the size/mtime (and optionally content hash) identifying a file."""
+    st = os.stat(path)
+    sha1 = None
+    if with_hash:
+        h = hashlib.sha1()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 16), b""):
+                h.update(chunk)
+        sha1 = h.hexdigest()
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha1": sha1}
+
+
+def normalize_name(s):
+    """Normalize a remedy name for matching (NFC, no zero-width joiners, casefolded)."""
+    if s is None:
+        return ""
+    s = unicodedata.normalize("NFC", str(s))
+    s = s.replace("\u200c", "").replace("\u200d", "")
+    s = s.replace("\u00a0", " ")
+    s = re.sub(r"\s+", " ", s).strip()
+    return s.casefold()
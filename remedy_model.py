@@ -0,0 +1,83 @@
+"""
+Virtualized Qt table model for remedy search results.
+
+The model holds the catalog name arrays once and a result list of row ids
+into them; the view asks only for the cells it paints. Rows are exposed in
+pages through canFetchMore/fetchMore, so a one-letter query matching
+thousands of remedies costs one list assignment instead of thousands of
+QTableWidgetItem allocations.
+"""
+
+from PyQt5 import QtCore
+
+
+class RemedyResultModel(QtCore.QAbstractTableModel):
+    PAGE_SIZE = 200
+
+    def __init__(self, headers=("Common Name", "Latin Name"), parent=None):
+        super().__init__(parent)
+        self._headers = list(headers)
+        self._common = []
+        self._latin = []
+        self._ids = []
+        self._loaded = 0
+
+    # ------------------ Data ------------------
+    def set_catalog(self, common, latin):
+        """Set the name arrays (lists, or dicts keyed by row id) that results point into."""
+        self.beginResetModel()
+        self._common = common
+        self._latin = latin
+        self._ids = []
+        self._loaded = 0
+        self.endResetModel()
+
+    def set_results(self, ids):
+        self.beginResetModel()
+        self._ids = list(ids)
+        self._loaded = min(self.PAGE_SIZE, len(self._ids))
+        self.endResetModel()
+
+    def clear(self):
+        self.set_results([])
+
+    def total(self):
+        """Number of results, including rows not fetched into the view yet."""
+        return len(self._ids)
+
+    def row_id(self, row):
+        return self._ids[row]
+
+    def names(self, row):
+        rid = self._ids[row]
+        return str(self._common[rid]), str(self._latin[rid])
+
+    # ------------------ QAbstractTableModel ------------------
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else self._loaded
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else 2
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid() or role not in (QtCore.Qt.DisplayRole, QtCore.Qt.ToolTipRole):
+            return None
+        return self.names(index.row())[index.column()]
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if role == QtCore.Qt.DisplayRole and orientation == QtCore.Qt.Horizontal:
+            return self._headers[section]
+        return super().headerData(section, orientation, role)
+
+    def canFetchMore(self, parent=QtCore.QModelIndex()):
+        return not parent.isValid() and self._loaded < len(self._ids)
+
+    def fetchMore(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return
+        count = min(self.PAGE_SIZE, len(self._ids) - self._loaded)
+        if count <= 0:
+            return
+        self.beginInsertRows(QtCore.QModelIndex(), self._loaded, self._loaded + count - 1)
+        self._loaded += count
+        self.endInsertRows()
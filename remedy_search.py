@@ -0,0 +1,549 @@
+"""
+Headless remedy search engine shared by every front-end.
+
+`SearchEngine` is built once per catalog load from the common and latin
+name columns. It normalizes them with `remedy_catalog.normalize_name`, owns
+the indexes below and their incremental-search caches, and answers
+`search(query, mode, limit)` with ranked row ids, so typing latency depends
+on the number of matches rather than the size of the catalog. It has no
+Qt or Kivy dependency.
+"""
+
+import threading
+from array import array
+from bisect import bisect_left, insort
+from itertools import islice
+
+from remedy_catalog import normalize_name
+
+try:
+    import numpy as np
+    from rapidfuzz import fuzz, process
+    RAPIDFUZZ_AVAILABLE = True
+except Exception:
+    RAPIDFUZZ_AVAILABLE = False
+
+
+def query_tokens(query):
+    """Split a raw query into normalized, non-empty tokens."""
+    return normalize_name(query).split()
+
+
+class SearchSession:
+    """Incremental narrowing for search-as-you-type.
+
+    Remembers a small stack of (query, hits). When the new query extends the
+    previous one only the previous hits are re-checked with `narrow`; on
+    backspace the stack is popped back to the cached result of the shorter
+    query. Only valid for modes where a longer query can never match more
+    rows than its prefix (substring and prefix modes, not fuzzy). Safe to
+    call from a background search thread.
+    """
+
+    def __init__(self, search, narrow, max_depth=32):
+        self._search = search
+        self._narrow = narrow
+        self.max_depth = max_depth
+        self._stack = []
+        self._lock = threading.Lock()
+
+    def reset(self):
+        with self._lock:
+            self._stack.clear()
+
+    def run(self, query):
+        """Hits for `query` (normalized here), reusing cached results when possible."""
+        with self._lock:
+            return self._run(normalize_name(query))
+
+    def _run(self, q):
+        if not q:
+            self._stack.clear()
+            return []
+        while self._stack and not q.startswith(self._stack[-1][0]):
+            self._stack.pop()
+        if self._stack:
+            prev_q, prev_hits = self._stack[-1]
+            if prev_q == q:
+                return prev_hits
+            hits = self._narrow(prev_hits, q)
+        else:
+            hits = self._search(q)
+        self._stack.append((q, hits))
+        if len(self._stack) > self.max_depth:
+            del self._stack[0]
+        return hits
+
+
+class TrigramIndex:
+    """Substring index for "Contains" search.
+
+    Every trigram (and bigram/unigram, for short tokens) of every field maps to
+    a sorted posting list of row positions. A token's candidates come from its
+    rarest n-gram; candidates are then verified with a plain substring test,
+    so results are exactly those of a full scan.
+    """
+
+    GRAM_SIZES = (1, 2, 3)
+
+    def __init__(self, columns):
+        self.columns = [list(col) for col in columns]
+        self.size = len(self.columns[0]) if self.columns else 0
+        self.postings = {}
+        for pos in range(self.size):
+            self._index(pos)
+
+    def _index(self, pos):
+        grams = set()
+        for col in self.columns:
+            text = col[pos]
+            for n in self.GRAM_SIZES:
+                for i in range(len(text) - n + 1):
+                    grams.add(text[i:i + n])
+        for g in grams:
+            plist = self.postings.get(g)
+            if plist is None:
+                self.postings[g] = plist = array("I")
+            plist.append(pos)
+
+    def add(self, texts):
+        """Append a row (one normalized text per column); returns its position."""
+        for col, text in zip(self.columns, texts):
+            col.append(text)
+        pos = self.size
+        self.size += 1
+        self._index(pos)
+        return pos
+
+    def _candidates(self, token):
+        n = min(len(token), max(self.GRAM_SIZES))
+        if n < min(self.GRAM_SIZES):
+            return None
+        best = None
+        for i in range(len(token) - n + 1):
+            plist = self.postings.get(token[i:i + n])
+            if plist is None:
+                return array("I")
+            if best is None or len(plist) < len(best):
+                best = plist
+        return best
+
+    def _matches(self, pos, tokens):
+        for t in tokens:
+            if not any(t in col[pos] for col in self.columns):
+                return False
+        return True
+
+    def search(self, tokens):
+        """Row positions whose fields contain every token (each in any field)."""
+        tokens = [t for t in tokens if t]
+        if not tokens:
+            return []
+        best = None
+        for t in tokens:
+            plist = self._candidates(t)
+            if plist is not None and (best is None or len(plist) < len(best)):
+                best = plist
+        candidates = range(self.size) if best is None else best
+        return self.narrow(candidates, tokens)
+
+    def narrow(self, positions, tokens):
+        """The subset of `positions` whose fields contain every token."""
+        return [pos for pos in positions if self._matches(pos, tokens)]
+
+    def session(self):
+        return SearchSession(lambda q: self.search(q.split()),
+                             lambda hits, q: self.narrow(hits, q.split()))
+
+
+class PrefixIndex:
+    """Sorted-array prefix index for "Starts-with" and "Word-prefix" search.
+
+    Full names and every distinct word of every name are kept in sorted key
+    arrays with parallel arrays of row positions; a prefix query is a bisect
+    for the key range followed by reading off its positions.
+    """
+
+    def __init__(self, columns):
+        full = sorted((text, pos) for col in columns for pos, text in enumerate(col))
+        words = sorted((w, pos) for col in columns for pos, text in enumerate(col) for w in set(text.split()))
+        self.columns = [list(col) for col in columns]
+        self._full_keys = [k for k, _ in full]
+        self._full_pos = array("I", (p for _, p in full))
+        self._word_keys = [k for k, _ in words]
+        self._word_pos = array("I", (p for _, p in words))
+
+    @staticmethod
+    def _lookup(keys, positions, prefix):
+        lo = bisect_left(keys, prefix)
+        hi = bisect_left(keys, prefix + "\U0010ffff", lo)
+        return sorted(set(positions[lo:hi]))
+
+    @staticmethod
+    def _insert(keys, positions, key, pos):
+        i = bisect_left(keys, key)
+        keys.insert(i, key)
+        positions.insert(i, pos)
+
+    def add(self, texts):
+        """Append a row (one normalized text per column); returns its position."""
+        pos = len(self.columns[0]) if self.columns else 0
+        for col, text in zip(self.columns, texts):
+            col.append(text)
+            self._insert(self._full_keys, self._full_pos, text, pos)
+            for w in set(text.split()):
+                self._insert(self._word_keys, self._word_pos, w, pos)
+        return pos
+
+    def starts_with(self, prefix):
+        """Row positions whose common or latin name starts with `prefix`."""
+        return self._lookup(self._full_keys, self._full_pos, prefix)
+
+    def word_prefix(self, prefix):
+        """Row positions with any word (in either name) starting with `prefix`."""
+        return self._lookup(self._word_keys, self._word_pos, prefix)
+
+    def iter_word_prefix(self, prefix):
+        """Distinct row positions with a word starting with `prefix`, in order of that word.
+
+        Lazy, so taking the first few of a huge range (a one-letter prefix) costs only those few.
+        """
+        keys, positions = self._word_keys, self._word_pos
+        seen = set()
+        for i in range(bisect_left(keys, prefix), len(keys)):
+            if not keys[i].startswith(prefix):
+                return
+            pos = positions[i]
+            if pos not in seen:
+                seen.add(pos)
+                yield pos
+
+    def starts_with_session(self):
+        def narrow(hits, q):
+            return [pos for pos in hits if any(col[pos].startswith(q) for col in self.columns)]
+        return SearchSession(self.starts_with, narrow)
+
+    def word_prefix_session(self):
+        # Only the first token of the query is used, as in the Word-prefix mode.
+        def narrow(hits, q):
+            first = q.split()[0]
+            return [pos for pos in hits
+                    if any(w.startswith(first) for col in self.columns for w in col[pos].split())]
+        return SearchSession(lambda q: self.word_prefix(q.split()[0]), narrow)
+
+
+class FuzzyMatcher:
+    """Persistent rapidfuzz matcher for "Fuzzy" mode and local AI suggestions.
+
+    Choices from all name columns are normalized once per catalog load and
+    scored against the query in a single `process.cdist` call across all
+    cores; each row keeps its best column score. `normalize_name` is used
+    instead of rapidfuzz's default_process, which strips Bengali vowel signs.
+    """
+
+    def __init__(self, columns, score_cutoff=60, limit=50, scorer=None, workers=-1):
+        if not RAPIDFUZZ_AVAILABLE:
+            raise RuntimeError("rapidfuzz not available")
+        self.names = [[str(s) for s in col] for col in columns]
+        self.size = len(self.names[0]) if self.names else 0
+        self.score_cutoff = score_cutoff
+        self.limit = limit
+        self.scorer = scorer or fuzz.WRatio
+        self.workers = workers
+        self._choices = [normalize_name(s) for col in self.names for s in col]
+
+    def add(self, names):
+        """Append a row (one display name per column)."""
+        # _choices is column-major: column c ends at (c + 1) * size + c after earlier inserts
+        for c, (col, name) in enumerate(zip(self.names, names)):
+            col.append(str(name))
+            self._choices.insert((c + 1) * self.size + c, normalize_name(name))
+        self.size += 1
+
+    def _scores(self, query, score_cutoff):
+        q = normalize_name(query)
+        if not q or not self.size:
+            return None
+        matrix = process.cdist([q], self._choices, scorer=self.scorer, processor=None,
+                               score_cutoff=score_cutoff, workers=self.workers)
+        return matrix[0].reshape(len(self.names), self.size)
+
+    @staticmethod
+    def _top(scores, cutoff, limit):
+        candidates = np.flatnonzero(scores >= cutoff) if cutoff else np.arange(len(scores))
+        if limit and len(candidates) > limit:
+            candidates = candidates[np.argpartition(-scores[candidates], limit - 1)[:limit]]
+        # best score first, catalog order among ties
+        return candidates[np.lexsort((candidates, -scores[candidates]))]
+
+    def search(self, query, score_cutoff=None, limit=None):
+        """Row positions of the best matches in any column, best first."""
+        cutoff = self.score_cutoff if score_cutoff is None else score_cutoff
+        scores = self._scores(query, cutoff)
+        if scores is None:
+            return []
+        best = scores.max(axis=0)
+        return self._top(best, cutoff, limit or self.limit).tolist()
+
+    def best_names(self, query, limit=10):
+        """(name, score) for the closest distinct names across all columns."""
+        scores = self._scores(query, 0)
+        if scores is None:
+            return []
+        flat = scores.ravel()
+        found, seen = [], set()
+        # over-fetch: the same name can appear in several rows and columns
+        for i in self._top(flat, 0, limit * 4).tolist():
+            name = self.names[i // self.size][i % self.size]
+            if name not in seen:
+                seen.add(name)
+                found.append((name, float(flat[i])))
+                if len(found) == limit:
+                    break
+        return found
+
+
+def _squeeze(word):
+    """Collapse doubled letters ("belladonna" -> "beladona"), the commonest phonetic slip."""
+    return "".join(c for i, c in enumerate(word) if i == 0 or c != word[i - 1])
+
+
+def _edit_distance(a, b, max_distance):
+    """Optimal string alignment distance, or max_distance + 1 once it is exceeded."""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    prev2, prev = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        if min(cur) > max_distance:
+            return max_distance + 1
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+class TypoIndex:
+    """SymSpell-style deletion index for typo-tolerant search over name words.
+
+    Every distinct word (with doubled letters collapsed) is stored under all
+    strings reachable by deleting up to `max_distance` characters from its
+    first `prefix_length` characters. A query word generates its own deletes,
+    so candidates within edit distance 1-2 are found with a handful of dict
+    lookups instead of a scan, then verified with a real edit distance. The
+    last query word also matches as a plain prefix, for search-as-you-type.
+    Rows are keyed by any hashable position (row index or store id) and can
+    be added incrementally.
+    """
+
+    def __init__(self, columns=(), max_distance=2, prefix_length=7):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self._words = {}      # squeezed word -> set of row positions
+        self._deletes = {}    # delete string -> list of squeezed words
+        self._sorted = []     # squeezed words, for prefix matching of the last token
+        self._lock = threading.Lock()
+        columns = [list(col) for col in columns]
+        with self._lock:
+            for pos in range(len(columns[0]) if columns else 0):
+                self._add(pos, [col[pos] for col in columns])
+            # One sort for the whole catalog; insort per word would make the build quadratic.
+            self._sorted = sorted(self._words)
+
+    def _edits(self, word, distance):
+        edits = {word}
+        frontier = {word}
+        for _ in range(distance):
+            frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+            edits |= frontier
+        return edits
+
+    def _allowed_distance(self, word):
+        # One- and two-letter words would match almost everything.
+        if len(word) <= 2:
+            return 0
+        if len(word) <= 4:
+            return min(1, self.max_distance)
+        return self.max_distance
+
+    def _add(self, pos, names):
+        """Index the words of `names` under `pos`; returns the words new to the index."""
+        new = []
+        for text in names:
+            for word in set(_squeeze(w) for w in text.split()):
+                rows = self._words.get(word)
+                if rows is None:
+                    self._words[word] = rows = set()
+                    new.append(word)
+                    for d in self._edits(word[:self.prefix_length], self.max_distance):
+                        self._deletes.setdefault(d, []).append(word)
+                rows.add(pos)
+        return new
+
+    def add(self, pos, names):
+        """Index the words of the normalized `names` under row `pos`."""
+        with self._lock:
+            for word in self._add(pos, names):
+                insort(self._sorted, word)
+
+    def lookup(self, word, prefix=False):
+        """{indexed word: distance} for words within the allowed distance of `word`.
+
+        With `prefix`, words starting with `word` are included at distance 0.
+        """
+        word = _squeeze(word)
+        max_d = self._allowed_distance(word)
+        found = {}
+        for d in self._edits(word[:self.prefix_length], max_d):
+            for cand in self._deletes.get(d, ()):
+                if cand not in found:
+                    found[cand] = _edit_distance(word, cand, max_d)
+        found = {w: dist for w, dist in found.items() if dist <= max_d}
+        if prefix:
+            i = bisect_left(self._sorted, word)
+            while i < len(self._sorted) and self._sorted[i].startswith(word):
+                found[self._sorted[i]] = 0
+                i += 1
+        return found
+
+    def search(self, tokens):
+        """Positions where every token is within edit distance of a word, closest first."""
+        tokens = [t for t in tokens if t]
+        if not tokens:
+            return []
+        totals = None
+        with self._lock:
+            for n, t in enumerate(tokens, 1):
+                best = {}
+                for word, dist in self.lookup(t, prefix=n == len(tokens)).items():
+                    for pos in self._words[word]:
+                        if dist < best.get(pos, dist + 1):
+                            best[pos] = dist
+                if totals is None:
+                    totals = best
+                else:
+                    totals = {pos: d + best[pos] for pos, d in totals.items() if pos in best}
+                if not totals:
+                    return []
+        return sorted(totals, key=lambda pos: (totals[pos], pos))
+
+
+CONTAINS = "contains"
+STARTS_WITH = "starts-with"
+WORD_PREFIX = "word-prefix"
+FUZZY = "fuzzy"
+TYPO = "typo"
+# Contains, falling back to typo-tolerant matching when nothing contains the query.
+AUTO = "auto"
+MODES = (CONTAINS, STARTS_WITH, WORD_PREFIX, FUZZY, TYPO, AUTO)
+# A Contains query whose words are all shorter than a trigram matches most of the
+# catalog; it is answered from the word-prefix index with at most this many rows.
+SHORT_QUERY_LIMIT = 200
+
+
+def _cell_text(value):
+    """Display text of a catalog cell; None and NaN (empty Excel cells) become ""."""
+    if value is None or value != value:
+        return ""
+    return str(value)
+
+
+class SearchEngine:
+    """One catalog load: normalized names, every index and their caches.
+
+    `common` and `latin` are the display names of each row; `ids` are the
+    row ids returned by `search` (row positions by default, store ids for
+    a `RemedyStore`). Rows can be appended with `add`. Safe to use from a
+    background search thread while the GUI thread adds rows.
+    """
+
+    def __init__(self, common, latin, ids=None, fuzzy_cutoff=60, fuzzy_limit=50):
+        common = [_cell_text(s) for s in common]
+        latin = [_cell_text(s) for s in latin]
+        keys = [[normalize_name(s) for s in common], [normalize_name(s) for s in latin]]
+        self.ids = None if ids is None else list(ids)
+        self.contains_index = TrigramIndex(keys)
+        self.prefix_index = PrefixIndex(keys)
+        self.typo_index = TypoIndex(keys)
+        self.fuzzy = FuzzyMatcher([common, latin], score_cutoff=fuzzy_cutoff,
+                                  limit=fuzzy_limit) if RAPIDFUZZ_AVAILABLE else None
+        self._sessions = {
+            CONTAINS: self.contains_index.session(),
+            STARTS_WITH: self.prefix_index.starts_with_session(),
+            WORD_PREFIX: self.prefix_index.word_prefix_session(),
+        }
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_rows(cls, rows, **kwargs):
+        """Build from (id, common, latin) tuples, as returned by `RemedyStore.rows()`."""
+        rows = list(rows)
+        return cls([r[1] for r in rows], [r[2] for r in rows], ids=[r[0] for r in rows], **kwargs)
+
+    def __len__(self):
+        return self.contains_index.size
+
+    def add(self, common, latin, rid=None):
+        """Append a row; `rid` is required when the engine was built with ids."""
+        common, latin = _cell_text(common), _cell_text(latin)
+        keys = (normalize_name(common), normalize_name(latin))
+        with self._lock:
+            pos = self.contains_index.add(keys)
+            self.prefix_index.add(keys)
+            self.typo_index.add(pos, keys)
+            if self.fuzzy is not None:
+                self.fuzzy.add((common, latin))
+            if self.ids is not None:
+                self.ids.append(rid)
+            for session in self._sessions.values():
+                session.reset()
+
+    def _short_contains(self, tokens):
+        # First rows, alphabetically by the matching word, with a word starting with the first token
+        # and containing the others.
+        rest = tokens[1:]
+        hits = (pos for pos in self.prefix_index.iter_word_prefix(tokens[0])
+                if not rest or self.contains_index.narrow([pos], rest))
+        return list(islice(hits, SHORT_QUERY_LIMIT))
+
+    def _positions(self, query, mode):
+        if mode == CONTAINS:
+            tokens = query_tokens(query)
+            if tokens and max(map(len, tokens)) < max(TrigramIndex.GRAM_SIZES):
+                return self._short_contains(tokens)
+        if mode in self._sessions:
+            # narrows the previous hits while the query keeps growing
+            return self._sessions[mode].run(query)
+        if mode == TYPO:
+            return self.typo_index.search(query_tokens(query))
+        if mode == FUZZY:
+            if self.fuzzy is None:
+                raise RuntimeError("rapidfuzz not available")
+            return self.fuzzy.search(query)
+        if mode == AUTO:
+            return self._positions(query, CONTAINS) or self._positions(query, TYPO)
+        raise ValueError(f"Unknown search mode: {mode}")
+
+    def search(self, query, mode=CONTAINS, limit=None):
+        """Ranked ids of the rows matching `query` in `mode`, at most `limit` of them.
+
+        Substring and prefix modes rank in catalog order, typo-tolerant by
+        edit distance and fuzzy by score. A Contains query of one- and
+        two-letter words matches word starts instead, the first
+        SHORT_QUERY_LIMIT rows alphabetically, so latency stays flat.
+        """
+        with self._lock:
+            hits = self._positions(query, mode)
+            if limit:
+                hits = hits[:limit]
+            return list(hits) if self.ids is None else [self.ids[p] for p in hits]
+
+    def best_names(self, query, limit=10):
+        """(name, score) for the closest distinct names; empty without rapidfuzz."""
+        if self.fuzzy is None:
+            return []
+        with self._lock:
+            return self.fuzzy.best_names(query, limit=limit)
@@ -0,0 +1,168 @@
+"""
+SQLite-backed remedy store.
+
+The catalog lives in a local SQLite database with the normalized
+common/latin names indexed for duplicate checks, so adding a medicine is a
+single transactional insert. Searching is `remedy_search.SearchEngine`'s
+job, built from `rows()`. remedies.xlsx stays the interchange format:
+`sync_from_excel` imports it in bulk when the workbook changes and
+`export_to_excel` writes pending additions back to it.
+"""
+
+import functools
+import json
+import logging
+import sqlite3
+import threading
+
+import pandas as pd
+
+from remedy_catalog import file_fingerprint, normalize_name
+
+
+def _locked(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class RemedyStore:
+    def __init__(self, db_path):
+        self.db_path = db_path
+        # Searches run on a background thread; the lock serializes use of the connection.
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.RLock()
+        self._init_schema()
+
+    def _init_schema(self):
+        with self.conn:
+            self.conn.execute("""CREATE TABLE IF NOT EXISTS remedies (
+                id INTEGER PRIMARY KEY,
+                common_col TEXT NOT NULL,
+                latin_col TEXT NOT NULL,
+                common_key TEXT NOT NULL,
+                latin_key TEXT NOT NULL,
+                extra TEXT,
+                synced INTEGER NOT NULL DEFAULT 1)""")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS remedies_common_key ON remedies(common_key)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS remedies_latin_key ON remedies(latin_key)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            # Databases from versions that also searched here carry an FTS5 index; drop it.
+            self.conn.execute("DROP TRIGGER IF EXISTS remedies_ai")
+            self.conn.execute("DROP TRIGGER IF EXISTS remedies_ad")
+            self.conn.execute("DROP TABLE IF EXISTS remedies_fts")
+
+    # ------------------ Meta ------------------
+    def _get_meta(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def _set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta(key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    # ------------------ Bulk sync ------------------
+    def _excel_changed(self, xlsx_path):
+        src = self._get_meta("source")
+        if not src or self.count() == 0:
+            return True
+        fingerprint = file_fingerprint(xlsx_path, with_hash=False)
+        if fingerprint["size"] == src["size"] and fingerprint["mtime_ns"] == src["mtime_ns"]:
+            return False
+        return file_fingerprint(xlsx_path)["sha1"] != src["sha1"]
+
+    @_locked
+    def sync_from_excel(self, xlsx_path):
+        """Import remedies.xlsx if it changed since the last sync. Returns True if imported.
+
+        Medicines added through the store but not yet exported are kept.
+        """
+        if not self._excel_changed(xlsx_path):
+            return False
+        df = pd.read_excel(xlsx_path, engine="openpyxl")
+        df = df.fillna("")
+        # Accept "Common_Col " style headers for the two name columns.
+        df.rename(columns={c: str(c).lower().strip() for c in df.columns
+                           if str(c).lower().strip() in ("common_col", "latin_col")}, inplace=True)
+        columns = [str(c) for c in df.columns]
+        extra_cols = [c for c in columns if c not in ("common_col", "latin_col")]
+        pending = self.conn.execute(
+            "SELECT common_col, latin_col FROM remedies WHERE synced = 0 ORDER BY id").fetchall()
+        rows = []
+        for rec in df.to_dict("records"):
+            common = str(rec.get("common_col", "")).strip()
+            latin = str(rec.get("latin_col", "")).strip()
+            extra = {c: rec[c] for c in extra_cols if rec[c] != ""}
+            rows.append((common, latin, normalize_name(common), normalize_name(latin),
+                         json.dumps(extra, default=str) if extra else None))
+        with self.conn:
+            self.conn.execute("DELETE FROM remedies")
+            self.conn.executemany(
+                "INSERT INTO remedies(common_col, latin_col, common_key, latin_key, extra) VALUES (?, ?, ?, ?, ?)",
+                rows)
+            self._set_meta("columns", columns)
+            self._set_meta("source", file_fingerprint(xlsx_path))
+        for common, latin in pending:
+            self.add(common, latin)
+        logging.info(f"Imported {len(rows)} remedies from {xlsx_path}.")
+        return True
+
+    @_locked
+    def export_to_excel(self, xlsx_path):
+        """Write the whole catalog back to remedies.xlsx and mark every row synced."""
+        columns = self._get_meta("columns") or ["latin_col", "common_col"]
+        records = []
+        for common, latin, extra in self.conn.execute(
+                "SELECT common_col, latin_col, extra FROM remedies ORDER BY id"):
+            rec = json.loads(extra) if extra else {}
+            rec["common_col"] = common
+            rec["latin_col"] = latin
+            records.append(rec)
+        for c in ("latin_col", "common_col"):
+            if c not in columns:
+                columns.append(c)
+        df = pd.DataFrame(records, columns=columns)
+        df.to_excel(xlsx_path, index=False, engine="openpyxl")
+        with self.conn:
+            self.conn.execute("UPDATE remedies SET synced = 1 WHERE synced = 0")
+            self._set_meta("source", file_fingerprint(xlsx_path))
+        logging.info(f"Exported {len(df)} remedies to {xlsx_path}.")
+
+    @property
+    @_locked
+    def dirty(self):
+        return self.conn.execute("SELECT 1 FROM remedies WHERE synced = 0 LIMIT 1").fetchone() is not None
+
+    # ------------------ Mutations ------------------
+    @_locked
+    def exists(self, common_name, latin_name):
+        row = self.conn.execute(
+            "SELECT 1 FROM remedies WHERE common_key = ? OR latin_key = ? LIMIT 1",
+            (normalize_name(common_name), normalize_name(latin_name))).fetchone()
+        return row is not None
+
+    @_locked
+    def add(self, common_name, latin_name):
+        """Insert a new medicine unless either name already exists. Returns the new id or None."""
+        common_name, latin_name = common_name.strip(), latin_name.strip()
+        with self.conn:
+            if self.exists(common_name, latin_name):
+                return None
+            cur = self.conn.execute(
+                "INSERT INTO remedies(common_col, latin_col, common_key, latin_key, synced) VALUES (?, ?, ?, ?, 0)",
+                (common_name, latin_name, normalize_name(common_name), normalize_name(latin_name)))
+        return cur.lastrowid
+
+    # ------------------ Queries ------------------
+    @_locked
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM remedies").fetchone()[0]
+
+    @_locked
+    def rows(self):
+        """All remedies as (id, common, latin) tuples in catalog order."""
+        return self.conn.execute("SELECT id, common_col, latin_col FROM remedies ORDER BY id").fetchall()
+
+    def close(self):
+        self.conn.close()
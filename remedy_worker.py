@@ -0,0 +1,76 @@
+"""
+Background search dispatch for the Qt front-ends.
+
+Searches run on a private QThreadPool instead of the GUI thread. Every
+submit() bumps a generation counter; a task that was superseded before it
+started returns at once and results from superseded tasks are dropped, so
+the newest query always wins and key input is never blocked by a search.
+"""
+
+from PyQt5 import QtCore
+
+
+class _TaskSignals(QtCore.QObject):
+    done = QtCore.pyqtSignal(int, object)
+    failed = QtCore.pyqtSignal(int, str)
+
+
+class _SearchTask(QtCore.QRunnable):
+    def __init__(self, dispatcher, generation, fn):
+        super().__init__()
+        self.dispatcher = dispatcher
+        self.generation = generation
+        self.fn = fn
+        self.signals = _TaskSignals()
+
+    def run(self):
+        if self.generation != self.dispatcher.generation:
+            self.signals.done.emit(self.generation, None)
+            return
+        try:
+            result = self.fn()
+        except Exception as e:
+            self.signals.failed.emit(self.generation, str(e))
+            return
+        self.signals.done.emit(self.generation, result)
+
+
+class SearchDispatcher(QtCore.QObject):
+    results_ready = QtCore.pyqtSignal(object)
+    search_failed = QtCore.pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.generation = 0
+        self._pool = QtCore.QThreadPool(self)
+        # A single worker: searches share session caches and queue behind each other.
+        self._pool.setMaxThreadCount(1)
+        self._pending = {}
+
+    def submit(self, fn):
+        """Run `fn()` in the background; its result is emitted unless superseded."""
+        self.generation += 1
+        task = _SearchTask(self, self.generation, fn)
+        task.signals.done.connect(self._on_done)
+        task.signals.failed.connect(self._on_failed)
+        # Keep the signal object alive until its queued emission is delivered.
+        self._pending[self.generation] = task.signals
+        self._pool.start(task)
+        return self.generation
+
+    def cancel(self):
+        """Drop the result of any search still running or queued."""
+        self.generation += 1
+
+    def wait(self, msecs=-1):
+        return self._pool.waitForDone(msecs)
+
+    def _on_done(self, generation, result):
+        self._pending.pop(generation, None)
+        if generation == self.generation:
+            self.results_ready.emit(result)
+
+    def _on_failed(self, generation, message):
+        self._pending.pop(generation, None)
+        if generation == self.generation:
+            self.search_failed.emit(message)
@@ -0,0 +1,92 @@
+import json
+import os
+
+from autocomplete_store import AutocompleteStore
+from records_consolidate import consolidate, merge_autocomplete
+from records_journal import RecordsJournal
+
+
+def write_store(path, uses):
+    store = AutocompleteStore()
+    for field, value, when in uses:
+        store.touch(field, value, when)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(store.to_json(), f)
+    return str(path)
+
+
+def test_merge_current_format_files_loads(tmp_path):
+    first = write_store(tmp_path / "a.json", [("potency", "200CH", 1000), ("potency", "200CH", 2000),
+                                              ("dose", "5 GLB", 1000)])
+    second = write_store(tmp_path / "b.json", [("potency", "200CH", 3000), ("shop", "SHOPX", 3000)])
+
+    merged = merge_autocomplete([first, second]).to_json()
+    out = tmp_path / "autocomplete.json"
+    out.write_text(json.dumps(merged), encoding="utf-8")
+
+    store = AutocompleteStore.from_json(json.loads(out.read_text(encoding="utf-8")))
+    assert store.ranked("potency") == ["200CH"]
+    assert store.ranked("dose") == ["5 GLB"]
+    assert store.ranked("shop") == ["SHOPX"]
+    hits, last_used, _ = store._fields["potency"]["200CH"]
+    assert (hits, last_used) == (3, 3000)
+
+
+def test_merge_reads_plain_lists(tmp_path):
+    old = tmp_path / "old.json"
+    old.write_text(json.dumps({"potency": ["30C", "200CH"]}), encoding="utf-8")
+    current = write_store(tmp_path / "new.json", [("potency", "1M", 1000)])
+
+    store = merge_autocomplete([str(old), current])
+    assert sorted(store.ranked("potency")) == ["1M", "200CH", "30C"]
+
+
+def test_from_json_ignores_malformed_usage():
+    store = AutocompleteStore.from_json({"potency": ["30C"], "_usage": ["potency"]}, now=1000)
+    assert store.ranked("potency") == ["30C"]
+    assert store._fields["potency"]["30C"] == [1, 1000, 1.0]
+
+
+def test_merge_combines_alias_maps(tmp_path):
+    store = AutocompleteStore()
+    store.touch("shop", "HOMEO MAHANAGAR NEWTOWN", 1000)
+    store.touch("shop", "HOMEO MAHANAGR NEWTOWN", 1000)
+    store.merge("shop", "HOMEO MAHANAGAR NEWTOWN", ["HOMEO MAHANAGR NEWTOWN"])
+    first = tmp_path / "a.json"
+    first.write_text(json.dumps(store.to_json()), encoding="utf-8")
+    # another copy still has the misspelling as a value of its own
+    second = write_store(tmp_path / "b.json", [("shop", "HOMEO MAHANAGR NEWTOWN", 2000)])
+
+    merged = merge_autocomplete([str(first), second]).to_json()
+    assert merged["_aliases"]["shop"]["homeo mahanagr newtown"] == "HOMEO MAHANAGAR NEWTOWN"
+
+    store = AutocompleteStore.from_json(merged)
+    assert store.ranked("shop") == ["HOMEO MAHANAGAR NEWTOWN"]
+    assert "_aliases" not in store._fields
+    assert store.resolve("shop", "homeo mahanagr newtown") == "HOMEO MAHANAGAR NEWTOWN"
+
+
+def test_from_json_ignores_malformed_aliases():
+    store = AutocompleteStore.from_json({"potency": ["30C"], "_aliases": ["potency"]}, now=1000)
+    assert store.ranked("potency") == ["30C"]
+    assert store._aliases == {}
+
+
+def test_consolidate_merges_sources_in_print_order(tmp_path):
+    first = tmp_path / "a.jsonl"
+    first.write_text("".join(json.dumps(r) + "\n" for r in [
+        {"Medicine": "ARNICA", "Timestamp": "2024-01-02T10:00:00"},
+        {"Medicine": "ARNICA", "Timestamp": "2024-01-02T10:00:00"},
+        {"Medicine": "SULPHUR", "Timestamp": "2024-03-01T09:00:00"},
+    ]), encoding="utf-8")
+    # a copy of the first store plus one label of its own
+    second = tmp_path / "b.jsonl"
+    second.write_text(first.read_text(encoding="utf-8")
+                      + json.dumps({"Medicine": "BELLADONNA", "Times": "NIGHT",
+                                    "Timestamp": "2024-02-05T08:00:00"}) + "\n", encoding="utf-8")
+
+    out = tmp_path / "out"
+    assert consolidate([str(first), str(second)], str(out)) == (7, 4)
+    records = list(RecordsJournal(str(out), str(out / "records.xlsx")).records())
+    assert [r["Medicine"] for r in records] == ["ARNICA", "ARNICA", "BELLADONNA", "SULPHUR"]
+    assert records[2]["Time"] == "NIGHT"
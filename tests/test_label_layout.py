@@ -0,0 +1,66 @@
+import re
+
+from label_layout import MIN_FONT_SIZE, SIZE_STEP, LabelLayout, _fit_size, render_pdf, unit_width, wrap_name
+
+LAYOUT = LabelLayout()
+
+
+def width(op):
+    return unit_width(op.text, op.font) * op.size
+
+
+def row(ops, n):
+    return [op for op in ops if op.row == n]
+
+
+def test_fit_size_is_the_largest_step_that_fits():
+    assert _fit_size(lambda s: True, 8) == 8
+    assert _fit_size(lambda s: s <= 6.6, 8) == 6.5
+    assert _fit_size(lambda s: False, 8) == MIN_FONT_SIZE
+    assert _fit_size(lambda s: s <= 7.3, 8) == 7.25
+
+
+def test_short_label_keeps_full_sizes_and_is_centred():
+    ops = LAYOUT.ops({"Medicine": "Arnica", "Potency": "30c", "Dose": "4 pills", "Time": "8AM",
+                      "Shop": "Shopx", "Branch/Phone": "City"})
+    assert LAYOUT.row_texts(ops) == ["ARNICA", "30C", "4 pills   8AM", "SHOPX", "CITY"]
+    for op in ops:
+        assert op.size == LAYOUT.rows[op.row][2]
+    for op in row(ops, 0) + row(ops, 3):
+        assert abs(op.x + width(op) / 2 - LAYOUT.center) < 0.01
+
+
+def test_long_name_wraps_then_shrinks_to_fit():
+    ops = LAYOUT.ops({"Medicine": "Arsenicum Album", "Potency": "200C"})
+    assert LAYOUT.row_texts(ops)[:2] == ["ARSENICUM ALBUM", "200C"]
+
+    ops = LAYOUT.ops({"Medicine": "Strychnos nux vomica tincture cum extractum gelsemium", "Potency": "1M"})
+    name = row(ops, 0) + row(ops, 1)
+    assert len(name) == 2 and name[1].text.endswith(" 1M")
+    assert MIN_FONT_SIZE <= name[0].size < LAYOUT.rows[0][2]
+    assert name[0].size == name[1].size
+    for op in name:
+        assert width(op) <= LAYOUT.max_width
+    # the largest size that fits: one step up the name no longer fits in two rows
+    words = "STRYCHNOS NUX VOMICA TINCTURE CUM EXTRACTUM GELSEMIUM".split()
+    assert wrap_name(words, "1M", name[0].font, name[0].size + SIZE_STEP, LAYOUT.max_width) is None
+
+
+def test_dose_and_time_shrink_together():
+    ops = LAYOUT.ops({"Medicine": "Arnica", "Dose": "4 pills three times daily",
+                      "Time": "8AM/12N/3PM/9PM"})
+    dose, time_op = row(ops, 2)
+    assert dose.size == time_op.size < LAYOUT.rows[2][2]
+    assert time_op.x + width(time_op) - dose.x <= LAYOUT.max_width + 0.01
+
+
+def test_unsplittable_name_overflows_instead_of_vanishing():
+    ops = LAYOUT.ops({"Medicine": "X" * 60, "Potency": "30C"})
+    assert LAYOUT.row_texts(ops)[:2] == ["X" * 60, "30C"]
+    assert row(ops, 0)[0].size == MIN_FONT_SIZE
+
+
+def test_render_pdf_writes_a_page_per_label(tmp_path):
+    pdf = tmp_path / "labels.pdf"
+    render_pdf(str(pdf), LAYOUT, [{"Medicine": "Arnica"}, {"Medicine": "Bryonia"}, {"Medicine": "Sulphur"}])
+    assert len(re.findall(rb"/Type /Page\b", pdf.read_bytes())) == 3
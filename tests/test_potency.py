@@ -0,0 +1,64 @@
+import pytest
+
+from potency import canonical_potency, complete, format_potency, parse_potency, potency_key
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("200CH", ("C", 200)),
+    ("200 C", ("C", 200)),
+    ("200c", ("C", 200)),
+    ("200", ("C", 200)),
+    ("1000C", ("C", 1000)),
+    ("1000CH", ("C", 1000)),
+    ("1M", ("C", 1000)),
+    ("M", ("C", 1000)),
+    ("10M", ("C", 10000)),
+    ("CM", ("C", 100000)),
+    ("MM", ("C", 1000000)),
+    ("6X", ("X", 6)),
+    ("6 D", ("X", 6)),
+    ("6DH", ("X", 6)),
+    ("LM 3", ("LM", 3)),
+    ("LM3", ("LM", 3)),
+    ("LM0/3", ("LM", 3)),
+    ("0/3", ("LM", 3)),
+    ("L.M. 3", ("LM", 3)),
+    ("Q", ("Q", 0)),
+    ("MT", ("Q", 0)),
+    ("Ø", ("Q", 0)),
+    ("200 C.", ("C", 200)),
+    ("45", ("C", 45)),
+])
+def test_parse_spellings(text, expected):
+    assert parse_potency(text) == expected
+
+
+def test_same_potency_compares_equal():
+    assert parse_potency("1000C") == parse_potency("1M") == parse_potency("1000CH")
+    assert potency_key("1000CH") == potency_key("1M") == "C:1000"
+    assert canonical_potency("1000CH") == "1M"
+
+
+@pytest.mark.parametrize("text", ["0.5", "5.0", "0.5 C", "1.5M", "", None, "LM 0/3 14D", "5 GLB", "X"])
+def test_rejects_non_potencies(text):
+    assert parse_potency(text) is None
+    assert potency_key(text) is None
+
+
+def test_canonical_potency_keeps_free_text():
+    assert canonical_potency("0.5") == "0.5"
+
+
+def test_format_potency():
+    assert format_potency(("C", 30)) == "30C"
+    assert format_potency(("C", 1000)) == "1M"
+    assert format_potency(("C", 100000)) == "CM"
+    assert format_potency(("X", 6)) == "6X"
+    assert format_potency(("LM", 3)) == "LM 3"
+    assert format_potency(("Q", 0)) == "Q"
+
+
+def test_complete():
+    assert complete("1M")[0] == "1M"
+    assert "LM 3" in complete("LM3")
+    assert complete("ZZ") == []
@@ -0,0 +1,112 @@
+import json
+import os
+
+import pandas as pd
+
+from records_journal import RecordsJournal, RecordsWriter
+from records_store import RecordsRepository
+
+LEGACY_ROWS = [
+    {"Medicine": "ARNICA MONTANA", "Potency": "30C", "Dose": "4 PILLS", "Quantity": 2,
+     "Shop": "SHOPX", "Branch/Phone": "CITY", "Timestamp": "2024-01-05 10:00:00"},
+    {"Medicine": "BELLADONNA", "Potency": "200CH", "Dose": "2 DROPS", "Quantity": 1,
+     "Shop": "SHOPX", "Branch/Phone": "CITY", "Timestamp": "2024-02-07 11:30:00"},
+    {"Medicine": "ARNICA MONTANA", "Potency": "1000C", "Dose": "4 PILLS", "Quantity": 1,
+     "Shop": "SHOPY", "Branch/Phone": "TOWN", "Timestamp": "2024-02-09 09:15:00"},
+]
+
+
+def legacy_journal(tmp_path):
+    xlsx = tmp_path / "records.xlsx"
+    pd.DataFrame(LEGACY_ROWS).to_excel(xlsx, index=False, engine="openpyxl")
+    return RecordsJournal(str(tmp_path / "journal"), str(xlsx), legacy_paths=[str(xlsx)])
+
+
+def test_writer_indexes_a_legacy_workbook_on_first_start(tmp_path):
+    journal = legacy_journal(tmp_path)
+    repository = RecordsRepository(str(tmp_path / "records.db"))
+    writer = RecordsWriter(journal, repository)
+    writer.close()
+
+    assert journal.partitions() == ["2024-01", "2024-02"]
+    assert repository.count() == 3
+    assert [r["Medicine"] for r in repository.query(medicine="ARNICA MONTANA")] == ["ARNICA MONTANA"] * 2
+
+
+def test_export_round_trips_every_key(tmp_path):
+    journal = RecordsJournal(str(tmp_path / "journal"), str(tmp_path / "records.xlsx"))
+    journal.append({"Medicine": "NUX VOMICA", "Potency": "30C", "Dose": "4 PILLS", "Time": "MORNING",
+                    "Times": 3, "Shop": "SHOPX", "Branch/Phone": "CITY", "Timestamp": "2024-03-01 08:00:00"})
+    journal.append({"Medicine": "SULPHUR", "Potency": "200CH", "Patient": "A. KUMAR",
+                    "Timestamp": "2024-04-02 09:00:00"})
+    assert journal.export_excel() == 2
+
+    copy = RecordsJournal(str(tmp_path / "copy"), journal.xlsx_path)
+    copy.import_legacy(journal.xlsx_path)
+    records = list(copy.records())
+    assert records[0]["Times"] == 3
+    assert records[1]["Patient"] == "A. KUMAR"
+    assert list(records[0])[-2:] == ["Times", "Patient"]
+
+
+def label(medicine, timestamp, **fields):
+    return dict({"Medicine": medicine, "Potency": "30C", "Shop": "SHOPX", "Timestamp": timestamp}, **fields)
+
+
+def test_append_partitions_by_month(tmp_path):
+    journal = RecordsJournal(str(tmp_path / "journal"), str(tmp_path / "records.xlsx"))
+    journal.append(label("ARNICA", "2024-01-31T23:59:00"))
+    journal.append_many([label("BRYONIA", "2024-02-01T00:00:00"), label("NUX VOMICA", ""),
+                         label("SULPHUR", "2024-02-10T12:00:00", Shop="SHOPY")])
+
+    assert journal.partitions() == ["undated", "2024-01", "2024-02"]
+    assert journal.partitions("2024-02-01", "2024-03-01") == ["2024-02"]
+    assert [r["Medicine"] for r in journal.records()] == ["NUX VOMICA", "ARNICA", "BRYONIA", "SULPHUR"]
+    assert [r["Medicine"] for r in journal.records(start="2024-02-01")] == ["BRYONIA", "SULPHUR"]
+    assert [r["Medicine"] for r in journal.records(shop="SHOPY")] == ["SULPHUR"]
+
+
+def test_torn_last_line_is_skipped(tmp_path):
+    journal = RecordsJournal(str(tmp_path / "journal"), str(tmp_path / "records.xlsx"))
+    journal.append(label("ARNICA", "2024-01-05T10:00:00"))
+    with open(journal.partition_path("2024-01"), "a", encoding="utf-8") as f:
+        f.write('{"Medicine": "BELLA')
+
+    reopened = RecordsJournal(journal.directory, journal.xlsx_path)
+    reopened.append(label("BRYONIA", "2024-01-06T10:00:00"))
+    assert [r["Medicine"] for r in reopened.records()] == ["ARNICA", "BRYONIA"]
+
+
+def test_repository_catches_up_with_new_lines_only(tmp_path):
+    journal = RecordsJournal(str(tmp_path / "journal"), str(tmp_path / "records.xlsx"))
+    repository = RecordsRepository(str(tmp_path / "records.db"))
+    journal.append(label("ARNICA", "2024-01-05T10:00:00", Dose="4 PILLS"))
+    assert repository.catch_up(journal) == 1
+    assert repository.catch_up(journal) == 0
+
+    journal.append_many([label("ARNICA", "2024-02-01T09:00:00", Potency="1000CH", Dose="2 DROPS"),
+                         label("BRYONIA", "2024-02-02T09:00:00")])
+    assert repository.catch_up(journal) == 2
+    assert repository.count() == 3
+    assert [r["Medicine"] for r in repository.query(start="2024-02-01")] == ["BRYONIA", "ARNICA"]
+    assert [r["Potency"] for r in repository.query(potency="1M")] == ["1000CH"]
+    assert repository.predict("ARNICA", "1M") == {"Dose": "2 DROPS"}
+
+    # a reopened repository resumes from the stored offsets
+    repository.close()
+    reopened = RecordsRepository(str(tmp_path / "records.db"))
+    journal.append(label("SULPHUR", "2024-02-03T09:00:00"))
+    assert reopened.catch_up(journal) == 1
+    assert reopened.count() == 4
+
+
+def test_legacy_jsonl_is_imported_once_and_set_aside(tmp_path):
+    legacy = tmp_path / "records.jsonl"
+    legacy.write_text("".join(json.dumps(label(m, ts)) + "\n" for m, ts in
+                              [("ARNICA", "2024-01-05T10:00:00"), ("BRYONIA", "")]), encoding="utf-8")
+    journal = RecordsJournal(str(tmp_path / "journal"), str(tmp_path / "records.xlsx"), legacy_paths=[str(legacy)])
+    journal.append(label("SULPHUR", "2024-01-06T10:00:00"))
+
+    assert not legacy.exists() and os.path.exists(str(legacy) + ".imported")
+    assert journal.partitions() == ["undated", "2024-01"]
+    assert [r["Medicine"] for r in journal.records()] == ["BRYONIA", "ARNICA", "SULPHUR"]
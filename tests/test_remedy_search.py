@@ -0,0 +1,89 @@
+import pytest
+
+from remedy_catalog import normalize_name
+from remedy_search import CONTAINS, STARTS_WITH, TYPO, WORD_PREFIX, SearchEngine
+
+COMMON = ["Arnica", "Belladonna", "Bryonia", "Nux Vomica", "Pulsatilla", "Rhus Tox",
+          "Arsenicum Album", "Calcarea Carb", "Carbo Veg", "Sulphur", "Ignatia", "Lycopodium"]
+LATIN = ["Arnica montana", "Atropa belladonna", "Bryonia alba", "Strychnos nux-vomica",
+         "Pulsatilla nigricans", "Rhus toxicodendron", "Arsenicum album", "Calcarea carbonica",
+         "Carbo vegetabilis", "Sulphur", "Ignatia amara", "Lycopodium clavatum"]
+QUERIES = ["a", "ar", "arn", "ca", "carb", "album", "nux vom", "VOMICA", "mont", "x", "lla", "zz", "rhus t"]
+
+
+def names(pos):
+    return [normalize_name(COMMON[pos]), normalize_name(LATIN[pos])]
+
+
+def reference(query, mode):
+    """What a scan over every row finds, the way the old Excel-backed search did."""
+    tokens = normalize_name(query).split()
+    q = normalize_name(query)
+    hits = []
+    for pos in range(len(COMMON)):
+        fields = names(pos)
+        if mode == CONTAINS:
+            found = all(any(t in f for f in fields) for t in tokens)
+        elif mode == STARTS_WITH:
+            found = any(f.startswith(q) for f in fields)
+        else:
+            # Word-prefix uses the first query word only
+            found = any(w.startswith(tokens[0]) for f in fields for w in f.split())
+        if found:
+            hits.append(pos)
+    return hits
+
+
+@pytest.fixture
+def engine():
+    return SearchEngine(COMMON, LATIN)
+
+
+@pytest.mark.parametrize("mode", [STARTS_WITH, WORD_PREFIX])
+def test_prefix_modes_match_a_scan(engine, mode):
+    for query in QUERIES:
+        assert sorted(engine.search(query, mode)) == reference(query, mode), query
+
+
+def test_contains_matches_a_scan(engine):
+    for query in QUERIES:
+        if min(len(t) for t in query.split()) >= 3:
+            assert sorted(engine.search(query, CONTAINS)) == reference(query, CONTAINS), query
+
+
+def test_short_contains_matches_word_starts(engine):
+    # one- and two-letter words match the start of a word, alphabetically by that word
+    assert sorted(engine.search("ar", CONTAINS)) == reference("ar", WORD_PREFIX)
+    assert [COMMON[p] for p in engine.search("ca", CONTAINS)] == ["Calcarea Carb", "Carbo Veg"]
+    assert engine.search("nu v", CONTAINS) == [COMMON.index("Nux Vomica")]
+
+
+def test_typing_and_backspace_give_fresh_results(engine):
+    queries = ["c", "ca", "car", "carb", "carbo", "carb", "ca"]
+    for mode in (CONTAINS, STARTS_WITH, WORD_PREFIX):
+        typed = [engine.search(q, mode) for q in queries]
+        assert typed == [SearchEngine(COMMON, LATIN).search(q, mode) for q in queries], mode
+
+
+def test_typo_finds_misspelled_names(engine):
+    assert COMMON.index("Belladonna") in engine.search("beledona", TYPO)
+    assert COMMON.index("Pulsatilla") in engine.search("pulsatila", TYPO)
+    assert engine.search("arnika mont", TYPO) == [COMMON.index("Arnica")]
+    assert engine.search("qwxyz", TYPO) == []
+
+
+def test_added_rows_are_found_in_every_mode(engine):
+    engine.search("gel", CONTAINS)
+    engine.add("Gelsemium", "Gelsemium sempervirens")
+    new = len(COMMON)
+    assert engine.search("gels", CONTAINS) == [new]
+    assert engine.search("gel", STARTS_WITH) == [new]
+    assert engine.search("sempe", WORD_PREFIX) == [new]
+    assert engine.search("gelsemum", TYPO) == [new]
+
+
+def test_ids_replace_positions():
+    engine = SearchEngine.from_rows([(10, "Arnica", "Arnica montana"), (20, "Bryonia", "Bryonia alba")])
+    assert engine.search("alba", CONTAINS) == [20]
+    engine.add("Arsenicum", "Arsenicum album", rid=30)
+    assert sorted(engine.search("alb", CONTAINS)) == [20, 30]
@@ -4,11 +4,19 @@ from PyQt5 import QtWidgets, QtGui, QtCore
 # Optional imports
 try:
     import pandas as pd
-    from rapidfuzz import process
     PANDAS_AVAILABLE = True
 except ImportError:
     PANDAS_AVAILABLE = False
 
+from remedy_search import CONTAINS, FUZZY, STARTS_WITH, WORD_PREFIX, SearchEngine
+
+SEARCH_MODES = {
+    "Contains": CONTAINS,
+    "Starts with": STARTS_WITH,
+    "Word prefix": WORD_PREFIX,
+    "Fuzzy": FUZZY,
+}
+
 
 class HomeoWindow(QtWidgets.QWidget):
     def __init__(self):
@@ -74,6 +82,8 @@ class HomeoWindow(QtWidgets.QWidget):
         if os.path.exists(path):
             try:
                 self.df = pd.read_excel(path, engine="openpyxl")
+                self.engine = SearchEngine(self.df.get("common_col", [""] * len(self.df)),
+                                           self.df.get("latin_col", [""] * len(self.df)))
                 self.status.setText(f"Loaded {len(self.df)} entries.")
                 self._populate_table(self.df)
             except Exception as e:
@@ -81,6 +91,7 @@ class HomeoWindow(QtWidgets.QWidget):
         else:
             self.status.setText("Excel file not found.")
             self.df = pd.DataFrame(columns=["common_col", "latin_col"])
+            self.engine = SearchEngine([], [])
 
     def load_excel(self):
         path, _ = QtWidgets.QFileDialog.getOpenFileName(self, "Open remedies.xlsx", "", "Excel Files (*.xlsx)")
@@ -108,27 +119,12 @@ class HomeoWindow(QtWidgets.QWidget):
             self._populate_table(self.df)
             return
 
-        mode = self.mode.currentText()
-        if mode == "Contains":
-            f = self.df[self.df.apply(lambda r: q in str(r.common_col).lower() or q in str(r.latin_col).lower(), axis=1)]
-        elif mode == "Starts with":
-            f = self.df[self.df.apply(lambda r: str(r.common_col).lower().startswith(q) or str(r.latin_col).lower().startswith(q), axis=1)]
-        elif mode == "Word prefix":
-            f = self.df[self.df.apply(lambda r: any(w.startswith(q) for w in str(r.common_col).lower().split()), axis=1)]
-        elif mode == "Fuzzy":
-            f = self._fuzzy_search(q)
-        else:
-            f = self.df
+        mode = SEARCH_MODES.get(self.mode.currentText(), CONTAINS)
+        f = self.df.iloc[self.engine.search(q, mode)]
 
         self._populate_table(f)
         self.status.setText(f"Found {len(f)} results for '{q}'")
 
-    def _fuzzy_search(self, q):
-        names = list(self.df.common_col) + list(self.df.latin_col)
-        matches = process.extract(q, names, limit=20)
-        found = set([m[0] for m in matches if m[1] > 50])
-        return self.df[self.df.apply(lambda r: r.common_col in found or r.latin_col in found, axis=1)]
-
     # ---------------------- ADD NEW ENTRY ----------------------
     def on_add_new(self):
         if not PANDAS_AVAILABLE: